@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import math
+import os
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from fastapi.responses import JSONResponse
+
+load_dotenv()
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# total concurrent DB-bound work; the default matches SQLAlchemy's pool
+# (pool_size 5 + max_overflow 10), so admitted work never waits on the pool
+ADMISSION_CAPACITY = int(os.getenv("ADMISSION_CAPACITY", "15"))
+ADMISSION_REALTIME_LIMIT = int(os.getenv("ADMISSION_REALTIME_LIMIT", "15"))
+ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", "10"))
+ADMISSION_READ_LIMIT = int(os.getenv("ADMISSION_READ_LIMIT", "8"))
+ADMISSION_BULK_LIMIT = int(os.getenv("ADMISSION_BULK_LIMIT", "2"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "100"))
+ADMISSION_QUEUE_TIMEOUT_MS = int(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "2000"))
+ADMISSION_RETRY_AFTER_SECONDS = float(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+ADMISSION_BULK_PATHS = os.getenv(
+    "ADMISSION_BULK_PATHS", "/users/all,/chats/all-messages"
+).split(",")
+# attachment transfers release their DB session before streaming
+ADMISSION_EXEMPT_PATHS = os.getenv(
+    "ADMISSION_EXEMPT_PATHS", "/metrics,/docs,/redoc,/openapi.json,/attachments"
+).split(",")
+
+# highest priority first: freed slots go to waiters in this order
+ROUTE_CLASSES = ("realtime", "write", "read", "bulk")
+
+logger = logging.getLogger("admission")
+
+
+class Overloaded(Exception):
+    def __init__(self, route_class: str, reason: str, retry_after: float):
+        super().__init__(f"{route_class} shed: {reason}")
+        self.route_class = route_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Lane:
+    __slots__ = ("name", "limit", "active", "waiters", "stats")
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.active = 0
+        self.waiters: deque[asyncio.Future] = deque()
+        self.stats: Counter = Counter()
+
+
+class AdmissionController:
+    """Bounds concurrent work per route class before it reaches the DB pool.
+
+    Work runs at once while both the shared capacity and its class limit
+    have room. Otherwise it waits in a bounded per-class queue for up to
+    queue_timeout; a full queue or an expired deadline raises Overloaded,
+    which callers turn into a fast 503. Freed slots go to the waiting
+    classes in ROUTE_CLASSES order, so WebSocket messages are served before
+    queued bulk reads, and a low bulk limit keeps room for everything else.
+    """
+
+    def __init__(
+        self,
+        capacity: int = ADMISSION_CAPACITY,
+        limits: dict[str, int] | None = None,
+        queue_size: int = ADMISSION_QUEUE_SIZE,
+        queue_timeout_ms: int = ADMISSION_QUEUE_TIMEOUT_MS,
+        retry_after: float = ADMISSION_RETRY_AFTER_SECONDS,
+    ):
+        limits = limits or {
+            "realtime": ADMISSION_REALTIME_LIMIT,
+            "write": ADMISSION_WRITE_LIMIT,
+            "read": ADMISSION_READ_LIMIT,
+            "bulk": ADMISSION_BULK_LIMIT,
+        }
+        self.capacity = capacity
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.retry_after = retry_after
+        self.active = 0
+        self._lanes = {name: _Lane(name, limits[name]) for name in ROUTE_CLASSES}
+
+    @asynccontextmanager
+    async def slot(self, route_class: str):
+        lane = self._lanes[route_class]
+        await self._acquire(lane)
+        try:
+            yield
+        finally:
+            self._release(lane)
+
+    async def _acquire(self, lane: _Lane):
+        if self._has_room(lane) and not self._waiting_at_or_above(lane):
+            self._start(lane)
+            return
+
+        if len(lane.waiters) >= self.queue_size:
+            lane.stats["shed"] += 1
+            raise Overloaded(lane.name, "queue full", self.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        lane.waiters.append(waiter)
+        lane.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # granted just as we gave up: pass the slot on
+                self._release(lane)
+            else:
+                waiter.cancel()
+                try:
+                    lane.waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                lane.stats["shed"] += 1
+                lane.stats["timed_out"] += 1
+                raise Overloaded(lane.name, "queue timeout", self.retry_after)
+            raise
+
+    def _has_room(self, lane: _Lane) -> bool:
+        return self.active < self.capacity and lane.active < lane.limit
+
+    def _waiting_at_or_above(self, lane: _Lane) -> bool:
+        for name in ROUTE_CLASSES:
+            if self._lanes[name].waiters:
+                return True
+            if name == lane.name:
+                return False
+        return False
+
+    def _start(self, lane: _Lane):
+        self.active += 1
+        lane.active += 1
+        lane.stats["admitted"] += 1
+
+    def _release(self, lane: _Lane):
+        self.active -= 1
+        lane.active -= 1
+        for name in ROUTE_CLASSES:
+            waiting = self._lanes[name]
+            while waiting.waiters and self._has_room(waiting):
+                waiter = waiting.waiters.popleft()
+                if waiter.done():
+                    continue
+                self._start(waiting)
+                waiter.set_result(None)
+            if self.active >= self.capacity:
+                return
+
+    def metrics(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "active": self.active,
+            "classes": {
+                name: {
+                    "limit": lane.limit,
+                    "active": lane.active,
+                    "waiting": len(lane.waiters),
+                    "admitted": lane.stats["admitted"],
+                    "queued": lane.stats["queued"],
+                    "shed": lane.stats["shed"],
+                    "timed_out": lane.stats["timed_out"],
+                }
+                for name, lane in self._lanes.items()
+            },
+        }
+
+
+admission = AdmissionController()
+
+
+def classify(scope) -> str | None:
+    """Route class of an HTTP request, or None when it bypasses admission."""
+    method = scope["method"]
+    path = scope["path"]
+    if method == "OPTIONS" or any(
+        path.startswith(prefix) for prefix in ADMISSION_EXEMPT_PATHS if prefix
+    ):
+        return None
+    if method in ("GET", "HEAD"):
+        return "bulk" if path in ADMISSION_BULK_PATHS else "read"
+    return "write"
+
+
+class AdmissionMiddleware:
+    """Runs each HTTP request inside an admission slot, or answers 503."""
+
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        route_class = classify(scope) if scope["type"] == "http" else None
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            async with self.controller.slot(route_class):
+                await self.app(scope, receive, send)
+        except Overloaded as e:
+            logger.warning(f"{scope['method']} {scope['path']}: {e}")
+            response = JSONResponse(
+                {"detail": "Server is busy, try again later."},
+                status_code=503,
+                headers={"Retry-After": str(math.ceil(e.retry_after))},
+            )
+            await response(scope, receive, send)
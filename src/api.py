@@ -3,6 +3,8 @@ from src.auth.router import router as auth_router
 from src.users.router import router as users_router
 from src.chats.router import router as chats_router
 from src.chats.websocket import router as websocket_router
+from src.metrics.router import router as metrics_router
+from src.attachments.router import router as attachments_router
 
 
 def register_routes(app: FastAPI):
@@ -10,3 +12,5 @@ def register_routes(app: FastAPI):
     app.include_router(users_router)
     app.include_router(chats_router)
     app.include_router(websocket_router)
+    app.include_router(metrics_router)
+    app.include_router(attachments_router)
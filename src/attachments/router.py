@@ -0,0 +1,120 @@
+import os
+import re
+from uuid import UUID
+
+from dotenv import load_dotenv
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse
+from starlette import status
+
+from src.dependency import DbSession
+from src.auth.service import CurrentUser
+from src.attachments.schemas import UploadCreateRequest, AttachmentResponse
+from src.attachments.service import (
+    create_upload,
+    get_upload,
+    record_progress,
+    get_attachment_for_download,
+)
+from src.attachments.storage import LocalDiskStorage, PartialWrite
+
+load_dotenv()
+
+ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(50 * 1024 * 1024)))
+ATTACHMENT_CHUNK_BYTES = int(os.getenv("ATTACHMENT_CHUNK_BYTES", str(5 * 1024 * 1024)))
+
+CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+router = APIRouter(prefix="/attachments", tags=["attachments"])
+
+storage = LocalDiskStorage()  # no disk access until the first upload
+# one writer per upload at a time
+_uploads_in_progress: set[UUID] = set()
+
+
+@router.post(
+    "/uploads",
+    status_code=status.HTTP_201_CREATED,
+    response_model=AttachmentResponse,
+)
+async def start_upload(
+    upload_request: UploadCreateRequest, db: DbSession, current_user: CurrentUser
+):
+    return create_upload(
+        db, current_user.get_uuid(), upload_request, ATTACHMENT_MAX_BYTES
+    )
+
+
+@router.get("/uploads/{id}", response_model=AttachmentResponse)
+async def get_upload_status(id: UUID, db: DbSession, current_user: CurrentUser):
+    """Where to resume from: the next chunk starts at `received`."""
+    return get_upload(db, current_user.get_uuid(), id)
+
+
+@router.put("/uploads/{id}", response_model=AttachmentResponse)
+async def upload_chunk(
+    id: UUID, request: Request, db: DbSession, current_user: CurrentUser
+):
+    match = CONTENT_RANGE.match(request.headers.get("content-range", ""))
+    if not match:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Content-Range: bytes <start>-<end>/<total> is required",
+        )
+    start, end, total = (int(group) for group in match.groups())
+
+    if id in _uploads_in_progress:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Another chunk of this upload is in progress",
+        )
+
+    _uploads_in_progress.add(id)
+    try:
+        upload = get_upload(db, current_user.get_uuid(), id)
+        if total != upload.size or end < start or end >= upload.size:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail=f"Range must lie within 0-{upload.size - 1}",
+            )
+        if start != upload.received:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload is at offset {upload.received}",
+            )
+        if end - start + 1 > ATTACHMENT_CHUNK_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Chunks are limited to {ATTACHMENT_CHUNK_BYTES} bytes",
+            )
+
+        # don't hold a pooled connection while the body streams in
+        db.close()
+
+        try:
+            written = await storage.write_at(
+                upload.storage_key, start, request.stream(), end - start + 1
+            )
+        except PartialWrite as e:
+            record_progress(db, id, start + e.written)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Upload interrupted at offset {start + e.written}: {e}",
+            )
+
+        return record_progress(db, id, start + written)
+    finally:
+        _uploads_in_progress.discard(id)
+
+
+@router.get("/{id}")
+async def download_attachment(id: UUID, db: DbSession, current_user: CurrentUser):
+    attachment = get_attachment_for_download(db, current_user.get_uuid(), id)
+    # FileResponse answers Range requests itself and uses the server's
+    # zero-copy path send extension for whole-file responses when available
+    return FileResponse(
+        storage.path(attachment.storage_key),
+        media_type=attachment.content_type,
+        filename=attachment.filename,
+    )
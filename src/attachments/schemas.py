@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+from uuid import UUID
+from datetime import datetime
+
+
+class UploadCreateRequest(BaseModel):
+    chat_id: UUID
+    filename: str = Field(min_length=1, max_length=255)
+    content_type: str = Field(default="application/octet-stream", max_length=255)
+    size: int = Field(gt=0, description="Total file size in bytes")
+
+
+class AttachmentResponse(BaseModel):
+    id: UUID
+    chat_id: UUID
+    filename: str
+    content_type: str
+    size: int
+    received: int
+    completed_at: datetime | None = None
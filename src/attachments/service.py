@@ -0,0 +1,160 @@
+from src.attachments.schemas import UploadCreateRequest, AttachmentResponse
+from src.entities.attachments import Attachments
+from src.entities.chat_members import ChatMembers
+from src.chats.membership import is_member
+import logging
+from starlette import status
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, func, insert, tuple_, update
+from fastapi import HTTPException
+from uuid import UUID
+import uuid
+
+ATTACHMENT_COLUMNS = (
+    Attachments.id,
+    Attachments.chat_id,
+    Attachments.filename,
+    Attachments.content_type,
+    Attachments.size,
+    Attachments.received,
+    Attachments.completed_at,
+)
+
+
+def create_upload(
+    db: Session, user_id: UUID, upload_request: UploadCreateRequest, max_bytes: int
+) -> AttachmentResponse:
+    if upload_request.size > max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Attachments are limited to {max_bytes} bytes",
+        )
+
+    if not is_member(db, user_id, upload_request.chat_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Chat not found."
+        )
+
+    try:
+        attachment_id = uuid.uuid4()
+        row = db.execute(
+            insert(Attachments)
+            .values(
+                id=attachment_id,
+                uploader_id=user_id,
+                chat_id=upload_request.chat_id,
+                filename=upload_request.filename,
+                content_type=upload_request.content_type,
+                size=upload_request.size,
+                storage_key=str(attachment_id),
+            )
+            .returning(*ATTACHMENT_COLUMNS)
+        ).one()
+        db.commit()
+
+        logging.info(f"Upload {row.id} started in chat {upload_request.chat_id}")
+        return AttachmentResponse.model_validate(row, from_attributes=True)
+
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Failed to start upload: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to start upload.",
+        )
+
+
+def get_upload(db: Session, user_id: UUID, attachment_id: UUID):
+    upload = (
+        db.query(*ATTACHMENT_COLUMNS, Attachments.storage_key)
+        .filter(Attachments.id == attachment_id, Attachments.uploader_id == user_id)
+        .first()
+    )
+
+    if not upload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found."
+        )
+
+    return upload
+
+
+def record_progress(
+    db: Session, attachment_id: UUID, received: int
+) -> AttachmentResponse:
+    row = db.execute(
+        update(Attachments)
+        .where(Attachments.id == attachment_id)
+        .values(
+            received=received,
+            completed_at=case(
+                (
+                    and_(
+                        Attachments.completed_at.is_(None),
+                        Attachments.size <= received,
+                    ),
+                    func.now(),
+                ),
+                else_=Attachments.completed_at,
+            ),
+        )
+        .returning(*ATTACHMENT_COLUMNS),
+        execution_options={"synchronize_session": False},
+    ).one()
+    db.commit()
+
+    if row.received >= row.size:
+        logging.info(f"Upload {attachment_id} completed ({received} bytes)")
+    return AttachmentResponse.model_validate(row, from_attributes=True)
+
+
+def get_attachment_for_download(db: Session, user_id: UUID, attachment_id: UUID):
+    attachment = (
+        db.query(
+            Attachments.filename,
+            Attachments.content_type,
+            Attachments.storage_key,
+        )
+        .join(
+            ChatMembers,
+            and_(
+                ChatMembers.chat_id == Attachments.chat_id,
+                ChatMembers.user_id == user_id,
+            ),
+        )
+        .filter(
+            Attachments.id == attachment_id,
+            Attachments.completed_at.is_not(None),
+        )
+        .first()
+    )
+
+    if not attachment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Attachment not found."
+        )
+
+    return attachment
+
+
+def get_sendable_attachment_ids(
+    db: Session, attachments: set[tuple[UUID, UUID, UUID]]
+) -> set[UUID]:
+    """Which (attachment_id, chat_id, sender_id) triples may be sent: the
+    sender's own complete upload to that chat. One query for any number."""
+    if not attachments:
+        return set()
+
+    rows = (
+        db.query(Attachments.id)
+        .filter(
+            and_(
+                tuple_(
+                    Attachments.id, Attachments.chat_id, Attachments.uploader_id
+                ).in_(attachments),
+                Attachments.completed_at.is_not(None),
+            )
+        )
+        .all()
+    )
+    return {row.id for row in rows}
@@ -0,0 +1,68 @@
+import asyncio
+import os
+from pathlib import Path
+from typing import AsyncIterator
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ATTACHMENTS_DIR = os.getenv("ATTACHMENTS_DIR", "storage/attachments")
+
+
+class PartialWrite(Exception):
+    """The stream stopped early; `written` bytes did reach the disk."""
+
+    def __init__(self, written: int, reason: str):
+        super().__init__(reason)
+        self.written = written
+
+
+class LocalDiskStorage:
+    """Stores attachment bytes as plain files under a root directory.
+
+    Uploads are written as they arrive, one network chunk at a time, so a
+    file is never held in memory as a whole. Directories are created on
+    the first write, so constructing one touches nothing on disk.
+    """
+
+    def __init__(self, root: str = ATTACHMENTS_DIR):
+        self.root = Path(root)
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    async def write_at(
+        self, key: str, offset: int, stream: AsyncIterator[bytes], limit: int
+    ) -> int:
+        """Write `stream` starting at `offset`, returning bytes written.
+
+        Anything after `offset` from an earlier, interrupted attempt is
+        truncated first. If the stream fails, raises PartialWrite with the
+        number of bytes that were kept. A stream that goes past `limit` is
+        rejected as a whole: the file is cut back to `offset` and
+        PartialWrite reports 0 bytes kept.
+        """
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        f = await asyncio.to_thread(open, path, "r+b" if path.exists() else "wb")
+        written = 0
+        try:
+            await asyncio.to_thread(f.truncate, offset)
+            f.seek(offset)
+            async for chunk in stream:
+                if written + len(chunk) > limit:
+                    await asyncio.to_thread(f.truncate, offset)
+                    raise PartialWrite(0, "Body is longer than its Content-Range")
+                await asyncio.to_thread(f.write, chunk)
+                written += len(chunk)
+            return written
+        except PartialWrite:
+            raise
+        except Exception as e:
+            raise PartialWrite(written, str(e)) from e
+        finally:
+            await asyncio.to_thread(f.close)
+
+    def delete(self, key: str):
+        self.path(key).unlink(missing_ok=True)
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import time
+from collections import Counter
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+WS_CONNECT_RATE = float(os.getenv("WS_CONNECT_RATE", "50"))
+WS_CONNECT_BURST = int(os.getenv("WS_CONNECT_BURST", "100"))
+WS_CONNECT_MAX_WAIT_MS = int(os.getenv("WS_CONNECT_MAX_WAIT_MS", "2000"))
+
+
+class ConnectRateLimiter:
+    """Token bucket for WebSocket accepts.
+
+    Up to `burst` connects go through at once, then `rate` per second.
+    A connect that finds the bucket empty reserves the next token and
+    sleeps until it is due, so a reconnect wave is spread out instead of
+    hitting Postgres in one go. If that wait would exceed max_wait_ms the
+    connect is refused and the client told to come back later.
+    """
+
+    def __init__(
+        self,
+        rate: float = WS_CONNECT_RATE,
+        burst: int = WS_CONNECT_BURST,
+        max_wait_ms: int = WS_CONNECT_MAX_WAIT_MS,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait_ms / 1000
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self.stats: Counter = Counter()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> bool:
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            self.stats["accepted"] += 1
+            return True
+
+        # tokens go negative: each waiter holds a place in line
+        wait = (1 - self._tokens) / self.rate
+        if wait > self.max_wait:
+            self.stats["rejected"] += 1
+            return False
+
+        self._tokens -= 1
+        self.stats["delayed"] += 1
+        await asyncio.sleep(wait)
+        self.stats["accepted"] += 1
+        return True
+
+    def backlog_seconds(self) -> float:
+        self._refill()
+        return max(0.0, -self._tokens / self.rate)
+
+    def metrics(self) -> dict:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "backlog_seconds": round(self.backlog_seconds(), 3),
+            **self.stats,
+        }
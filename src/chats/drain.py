@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import os
+import random
+import signal
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# clients are told to wait a random delay in this range before reconnecting
+WS_RECONNECT_MIN_MS = int(os.getenv("WS_RECONNECT_MIN_MS", "1000"))
+WS_RECONNECT_MAX_MS = int(os.getenv("WS_RECONNECT_MAX_MS", "30000"))
+WS_DRAIN_TIMEOUT_SECONDS = float(os.getenv("WS_DRAIN_TIMEOUT_SECONDS", "10"))
+WS_DRAIN_ON_SIGTERM = os.getenv("WS_DRAIN_ON_SIGTERM", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+
+def reconnect_delay_ms(min_ms: int | None = None) -> int:
+    min_ms = WS_RECONNECT_MIN_MS if min_ms is None else max(min_ms, WS_RECONNECT_MIN_MS)
+    return random.randint(min(min_ms, WS_RECONNECT_MAX_MS), WS_RECONNECT_MAX_MS)
+
+
+def install_sigterm_drain(manager, timeout: float = WS_DRAIN_TIMEOUT_SECONDS):
+    """Drain WebSockets on SIGTERM before the server's own handler runs.
+
+    Uvicorn closes every socket with 1012 as soon as it sees SIGTERM, which
+    is before lifespan shutdown, so the drain has to run first. The
+    previous handler is restored and the signal re-raised afterwards.
+    """
+    loop = asyncio.get_running_loop()
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def hand_over():
+        signal.signal(signal.SIGTERM, previous)
+        signal.raise_signal(signal.SIGTERM)
+
+    async def drain_then_hand_over():
+        try:
+            await asyncio.wait_for(manager.drain(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"WebSocket drain did not finish within {timeout}s")
+        except Exception as e:
+            logging.error(f"WebSocket drain failed: {e}")
+        finally:
+            hand_over()
+
+    def on_sigterm(signum, frame):
+        if manager.draining:
+            # second SIGTERM: stop waiting
+            hand_over()
+            return
+        loop.call_soon_threadsafe(loop.create_task, drain_then_hand_over())
+
+    try:
+        signal.signal(signal.SIGTERM, on_sigterm)
+    except ValueError:
+        # not the main thread (e.g. some test runners); lifespan still drains
+        logging.info("SIGTERM drain not installed outside the main thread")
@@ -0,0 +1,15 @@
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from src.entities.chat_members import ChatMembers
+
+
+def is_member(db: Session, user_id: UUID, chat_id: UUID) -> bool:
+    # primary key lookup on chat_members
+    return (
+        db.query(ChatMembers.chat_id)
+        .filter(ChatMembers.chat_id == chat_id, ChatMembers.user_id == user_id)
+        .first()
+        is not None
+    )
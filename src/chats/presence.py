@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Set
+from uuid import UUID
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PRESENCE_TICK_MS = int(os.getenv("PRESENCE_TICK_MS", "250"))
+TYPING_TTL_SECONDS = float(os.getenv("TYPING_TTL_SECONDS", "3"))
+
+
+class _ChatChanges:
+    __slots__ = ("online", "offline", "typing")
+
+    def __init__(self):
+        self.online: Set[UUID] = set()
+        self.offline: Set[UUID] = set()
+        self.typing = False
+
+
+class PresenceTracker:
+    """Online/offline and typing state, kept in memory only.
+
+    Events are not sent as they happen: they mark the chat dirty and the
+    tick loop sends one "presence" frame per dirty chat every tick.
+    Typing expires on its own when the client stops refreshing it.
+    """
+
+    def __init__(
+        self,
+        manager,
+        tick_ms: int = PRESENCE_TICK_MS,
+        typing_ttl: float = TYPING_TTL_SECONDS,
+    ):
+        self.manager = manager
+        self.tick = tick_ms / 1000
+        self.typing_ttl = typing_ttl
+        # chat_id -> user_id -> monotonic expiry
+        self._typing: Dict[UUID, Dict[UUID, float]] = {}
+        self._changes: Dict[UUID, _ChatChanges] = {}
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _changes_for(self, chat_id: UUID) -> _ChatChanges:
+        changes = self._changes.get(chat_id)
+        if changes is None:
+            changes = self._changes[chat_id] = _ChatChanges()
+        return changes
+
+    def user_online(self, user_id: UUID):
+        for chat_id in self.manager.chats_for_user(user_id):
+            changes = self._changes_for(chat_id)
+            changes.offline.discard(user_id)
+            changes.online.add(user_id)
+
+    def user_offline(self, user_id: UUID):
+        for chat_id in self.manager.chats_for_user(user_id):
+            changes = self._changes_for(chat_id)
+            changes.online.discard(user_id)
+            changes.offline.add(user_id)
+            self._clear_typing(chat_id, user_id)
+
+    def typing(self, user_id: UUID, chat_id: UUID):
+        if user_id not in self.manager.active_chats.get(chat_id, ()):
+            return
+        typers = self._typing.setdefault(chat_id, {})
+        if user_id not in typers:
+            self._changes_for(chat_id).typing = True
+        # refreshing an existing typer only pushes the expiry out
+        typers[user_id] = time.monotonic() + self.typing_ttl
+
+    def stop_typing(self, user_id: UUID, chat_id: UUID):
+        self._clear_typing(chat_id, user_id)
+
+    def _clear_typing(self, chat_id: UUID, user_id: UUID):
+        typers = self._typing.get(chat_id)
+        if typers and typers.pop(user_id, None) is not None:
+            self._changes_for(chat_id).typing = True
+            if not typers:
+                del self._typing[chat_id]
+
+    def _expire_typing(self, now: float):
+        for chat_id, typers in list(self._typing.items()):
+            expired = [user_id for user_id, expires in typers.items() if expires <= now]
+            for user_id in expired:
+                self._clear_typing(chat_id, user_id)
+
+    async def flush(self):
+        self._expire_typing(time.monotonic())
+        if not self._changes:
+            return
+
+        changes, self._changes = self._changes, {}
+        for chat_id, change in changes.items():
+            payload = {"event": "presence", "chat_id": str(chat_id)}
+            if change.online:
+                payload["online"] = [str(user_id) for user_id in change.online]
+            if change.offline:
+                payload["offline"] = [str(user_id) for user_id in change.offline]
+            if change.typing:
+                payload["typing"] = [
+                    str(user_id) for user_id in self._typing.get(chat_id, ())
+                ]
+            try:
+                await self.manager.broadcast_to_chat(chat_id, payload)
+            except Exception as e:
+                logging.warning(f"Presence broadcast failed for chat {chat_id}: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"Presence tick failed: {e}")
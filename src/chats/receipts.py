@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+from uuid import UUID
+
+from dotenv import load_dotenv
+
+from src.database.dbcore import SessionLocal
+from src.chats.service import upsert_read_watermarks
+
+load_dotenv()
+
+READ_RECEIPT_FLUSH_MS = int(os.getenv("READ_RECEIPT_FLUSH_MS", "2000"))
+
+
+class _Watermark:
+    __slots__ = ("message_id", "read_at")
+
+    def __init__(self, message_id: UUID | None, read_at: datetime):
+        self.message_id = message_id
+        self.read_at = read_at
+
+
+class ReadReceiptBuffer:
+    """Last-read watermark per (user, chat), held in memory.
+
+    The watermark is the created_at of the last message read, resolved by
+    the server. advance() only accepts forward moves and returns the new
+    position. Dirty watermarks are written by the flush loop with a single
+    upsert per interval instead of one UPDATE per read event; until then,
+    unflushed() lets readers of unread counts overlay them.
+    """
+
+    def __init__(self, flush_ms: int = READ_RECEIPT_FLUSH_MS):
+        self.interval = flush_ms / 1000
+        self._watermarks: Dict[Tuple[UUID, UUID], _Watermark] = {}
+        self._dirty: set[Tuple[UUID, UUID]] = set()
+        # taken out of _dirty by a flush whose write has not finished yet
+        self._writing: set[Tuple[UUID, UUID]] = set()
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def seed(self, user_id: UUID, chat_id: UUID, message_id, read_at: datetime):
+        """Load a persisted watermark without marking it dirty."""
+        key = (user_id, chat_id)
+        current = self._watermarks.get(key)
+        if current is None or current.read_at < read_at:
+            self._watermarks[key] = _Watermark(message_id, read_at)
+
+    def advance(
+        self, user_id: UUID, chat_id: UUID, message_id, read_at: datetime
+    ) -> datetime | None:
+        if read_at.tzinfo is None:
+            read_at = read_at.replace(tzinfo=timezone.utc)
+
+        key = (user_id, chat_id)
+        current = self._watermarks.get(key)
+        if current is not None and read_at <= current.read_at:
+            return None
+
+        self._watermarks[key] = _Watermark(message_id, read_at)
+        self._dirty.add(key)
+        return read_at
+
+    def read_at(self, user_id: UUID, chat_id: UUID) -> datetime | None:
+        mark = self._watermarks.get((user_id, chat_id))
+        return mark.read_at if mark is not None else None
+
+    def forget(self, user_id: UUID, chat_ids):
+        """Drop clean watermarks of a user who went offline."""
+        for chat_id in chat_ids:
+            key = (user_id, chat_id)
+            if key not in self._dirty:
+                self._watermarks.pop(key, None)
+
+    def unflushed(self, user_id: UUID, chat_ids) -> Dict[UUID, datetime]:
+        """read_at per chat for the user's watermarks not in the DB yet."""
+        unflushed = {}
+        for chat_id in chat_ids:
+            key = (user_id, chat_id)
+            if key in self._dirty or key in self._writing:
+                unflushed[chat_id] = self._watermarks[key].read_at
+        return unflushed
+
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    async def flush(self):
+        async with self._lock:
+            if not self._dirty:
+                return
+
+            dirty, self._dirty = self._dirty, set()
+            self._writing = dirty
+            rows = []
+            for user_id, chat_id in dirty:
+                mark = self._watermarks[(user_id, chat_id)]
+                rows.append((user_id, chat_id, mark.message_id, mark.read_at))
+
+            try:
+                await asyncio.to_thread(self._write, rows)
+            except Exception as e:
+                # keep them for the next interval
+                self._dirty |= dirty
+                logging.error(f"Read receipt flush failed, will retry: {e}")
+            finally:
+                self._writing = set()
+
+    @staticmethod
+    def _write(rows):
+        db = SessionLocal()
+        try:
+            upsert_read_watermarks(db, rows)
+        finally:
+            db.close()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
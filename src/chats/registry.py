@@ -0,0 +1,92 @@
+from typing import Dict, Set
+from uuid import UUID
+from weakref import WeakValueDictionary
+from datetime import datetime, timezone
+
+from fastapi import WebSocket
+
+
+class ConnectionEntry:
+    """One open socket. Kept in __slots__ so 100k of them stay small."""
+
+    __slots__ = (
+        "user_id",
+        "websocket",
+        "connected_at",
+        "batching",
+        "pending",
+    )
+
+    def __init__(self, user_id: UUID, websocket: WebSocket, batching: bool = False):
+        self.user_id = user_id
+        self.websocket = websocket
+        self.connected_at = datetime.now(timezone.utc).timestamp()
+        # negotiated per client: outbound events are coalesced into arrays
+        self.batching = batching
+        self.pending: list[str] | None = None
+
+
+class ConnectionRegistry:
+    """user_id -> set of open sockets, with O(1) add/remove per socket.
+
+    UUIDs are interned so the ids rebuilt for every message and every
+    chat participant list resolve to one shared object per user.
+    """
+
+    __slots__ = ("_by_user", "_by_socket", "_interned")
+
+    def __init__(self):
+        self._by_user: Dict[UUID, Set[ConnectionEntry]] = {}
+        self._by_socket: Dict[WebSocket, ConnectionEntry] = {}
+        # uuid.int -> UUID, dropped automatically once nothing references it
+        self._interned: "WeakValueDictionary[int, UUID]" = WeakValueDictionary()
+
+    def intern(self, user_id: UUID) -> UUID:
+        if not isinstance(user_id, UUID):
+            user_id = UUID(str(user_id))
+        existing = self._interned.get(user_id.int)
+        if existing is not None:
+            return existing
+        self._interned[user_id.int] = user_id
+        return user_id
+
+    def add(
+        self, user_id: UUID, websocket: WebSocket, batching: bool = False
+    ) -> ConnectionEntry:
+        user_id = self.intern(user_id)
+        entry = self._by_socket.get(websocket)
+        if entry is not None:
+            return entry
+
+        entry = ConnectionEntry(user_id, websocket, batching)
+        self._by_socket[websocket] = entry
+        self._by_user.setdefault(user_id, set()).add(entry)
+        return entry
+
+    def remove(self, websocket: WebSocket) -> ConnectionEntry | None:
+        entry = self._by_socket.pop(websocket, None)
+        if entry is None:
+            return None
+
+        entries = self._by_user.get(entry.user_id)
+        if entries is not None:
+            entries.discard(entry)
+            if not entries:
+                del self._by_user[entry.user_id]
+        return entry
+
+    def all_entries(self) -> list[ConnectionEntry]:
+        return list(self._by_socket.values())
+
+    def entries(self, user_id: UUID) -> list[ConnectionEntry]:
+        entries = self._by_user.get(user_id)
+        return list(entries) if entries else []
+
+    def user_count(self) -> int:
+        return len(self._by_user)
+
+    def __contains__(self, user_id: UUID) -> bool:
+        return user_id in self._by_user
+
+    def __len__(self) -> int:
+        return len(self._by_socket)
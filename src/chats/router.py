@@ -1,59 +1,140 @@
-from fastapi import APIRouter, Depends, Response, Request, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, Request, Query
 from fastapi.security import OAuth2PasswordRequestForm
 from starlette import status
+from uuid import UUID
 from src.dependency import DbSession
 from src.chats.service import (
     get_all_user_chat,
     get_all_messages_for_chat,
     create_chat,
+    create_group_chat,
+    add_chat_members,
+    remove_chat_member,
+    get_chat_member_ids,
     create_message,
     delete_message_by_id,
 )
+from src.chats.membership import is_member
 from src.auth.service import CurrentUser
-from src.chats.schemas import MessageRequest
+from src.chats.schemas import (
+    MessageRequest,
+    MessageResponse,
+    ChatResponse,
+    GroupCreateRequest,
+    ChatMembersRequest,
+    ChatMembersResponse,
+)
 from src.chats.websocket import manager
 
 
 router = APIRouter(prefix="/chats", tags=["chats"])
 
 
-@router.get("/all-messages")
+@router.get("/all-messages", response_model=list[MessageResponse])
 async def get_all_messages(
     db: DbSession,
     current_user: CurrentUser,
     chat_id: str = Query(..., description="Chat ID to fetch messages for"),
 ):
     messages = get_all_messages_for_chat(
-        db, chat_id=chat_id, current_user_id=current_user.user_id
+        db, chat_id=chat_id, current_user_id=current_user.get_uuid()
     )
     return messages
 
 
-@router.get("/all-chats")
+@router.get("/all-chats", response_model=list[ChatResponse])
 async def get_all_chats(
     db: DbSession,
     current_user: CurrentUser,
 ):
-    chats = get_all_user_chat(db, current_user.user_id)
+    # read receipts still buffered in memory are overlaid on the stored
+    # ones instead of being flushed by every chat list request
+    user_id = current_user.get_uuid()
+    unflushed = manager.read_receipts.unflushed(
+        user_id, manager.chats_for_user(user_id)
+    )
+    chats = get_all_user_chat(db, user_id, unflushed)
     return chats
 
 
-@router.post("/create-chat")
+@router.post("/create-chat", response_model=ChatResponse)
 async def create_users_chat(
     db: DbSession,
     current_user: CurrentUser,
-    user2_id: str = Query(..., description="User ID to create chat"),
+    user2_id: UUID = Query(..., description="User ID to create chat"),
+):
+    chat = create_chat(db, user1_id=current_user.get_uuid(), user2_id=user2_id)
+    manager.track_chat(chat.id, [chat.user1_id, chat.user2_id])
+    return chat
+
+
+@router.post("/create-group", response_model=ChatResponse)
+async def create_group(
+    group_request: GroupCreateRequest,
+    db: DbSession,
+    current_user: CurrentUser,
+):
+    chat, member_ids = create_group_chat(db, current_user.get_uuid(), group_request)
+    manager.track_chat(chat.id, member_ids)
+    await manager.send_members_changed(chat.id, added=member_ids)
+    return chat
+
+
+@router.get("/{chat_id}/members", response_model=ChatMembersResponse)
+async def get_members(
+    chat_id: UUID,
+    db: DbSession,
+    current_user: CurrentUser,
 ):
-    return create_chat(db, user1_id=current_user.user_id, user2_id=user2_id)
+    if not is_member(db, current_user.get_uuid(), chat_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Chat not found."
+        )
+    member_ids = get_chat_member_ids(db, [chat_id]).get(chat_id, [])
+    return ChatMembersResponse(chat_id=chat_id, user_ids=member_ids)
+
+
+@router.post("/{chat_id}/members", response_model=ChatMembersResponse)
+async def add_members(
+    chat_id: UUID,
+    members_request: ChatMembersRequest,
+    db: DbSession,
+    current_user: CurrentUser,
+):
+    added = add_chat_members(
+        db, chat_id, current_user.get_uuid(), members_request.user_ids
+    )
+    if added:
+        await manager.send_members_changed(chat_id, added=added)
+    return ChatMembersResponse(chat_id=chat_id, user_ids=added)
+
+
+@router.delete("/{chat_id}/members/{user_id}")
+async def remove_member(
+    chat_id: UUID,
+    user_id: UUID,
+    db: DbSession,
+    current_user: CurrentUser,
+):
+    remove_chat_member(db, chat_id, current_user.get_uuid(), user_id)
+    await manager.send_members_changed(chat_id, removed=[user_id])
+    return {"success": True}
 
 
-@router.post("/create-message")
+@router.post("/create-message", response_model=MessageResponse)
 async def create_user_message(
     message_request: MessageRequest,
     db: DbSession,
     current_user: CurrentUser,
 ):
-    return create_message(db, message_request)
+    if message_request.sender_id != current_user.get_uuid():
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cannot send messages as another user",
+        )
+    message = create_message(db, message_request)
+    manager.note_message(message.chat_id, message.id, message.created_at)
+    return message
 
 
 @router.delete("/delete-message/{id}")
@@ -62,7 +143,7 @@ async def delete_message(
     current_user: CurrentUser,
     id: str,
 ):
-    chat_id = delete_message_by_id(db, id)
+    chat_id = delete_message_by_id(db, id, current_user.get_uuid())
 
     await manager.send_message_deleted(chat_id, id)
 
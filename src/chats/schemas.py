@@ -1,21 +1,44 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from uuid import UUID
+from datetime import datetime
 
 
 class ChatResponse(BaseModel):
     id: UUID
-    user1_id: UUID
-    user2_id: UUID
+    # only set for direct chats
+    user1_id: UUID | None = None
+    user2_id: UUID | None = None
+    is_group: bool = False
+    title: str | None = None
+    created_at: datetime | None = None
+    unread_count: int = 0
+
+
+class GroupCreateRequest(BaseModel):
+    title: str = Field(min_length=1, max_length=100)
+    member_ids: list[UUID] = []
+
+
+class ChatMembersRequest(BaseModel):
+    user_ids: list[UUID] = Field(min_length=1)
+
+
+class ChatMembersResponse(BaseModel):
+    chat_id: UUID
+    user_ids: list[UUID]
 
 
 class MessageRequest(BaseModel):
     chat_id: UUID
     sender_id: UUID
     content: str
+    attachment_id: UUID | None = None
 
 
 class MessageResponse(BaseModel):
     id: UUID
     chat_id: UUID
     sender_id: UUID
-    content: str
+    content: str | None
+    attachment_id: UUID | None = None
+    created_at: datetime | None = None
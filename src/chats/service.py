@@ -1,29 +1,106 @@
-from src.chats.schemas import ChatResponse, MessageRequest, MessageResponse
+from src.chats.schemas import (
+    ChatResponse,
+    GroupCreateRequest,
+    MessageRequest,
+    MessageResponse,
+)
 from src.entities.chats import Chats
+from src.entities.chat_members import ChatMembers
+from src.entities.users import Users
 from src.entities.messages import Messages
+from src.entities.read_receipts import ReadReceipts
+from src.attachments.service import get_sendable_attachment_ids
+from src.chats.membership import is_member
 import logging
+import os
+from collections import defaultdict
+from dotenv import load_dotenv
 from starlette import status
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, and_, case, delete, func, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from pydantic import TypeAdapter
+from datetime import datetime
 from uuid import UUID
 from fastapi import HTTPException
-from uuid import UUID
+
+load_dotenv()
+
+GROUP_MAX_MEMBERS = int(os.getenv("GROUP_MAX_MEMBERS", "10000"))
+
+# validate whole row lists in one pydantic-core call instead of per ORM object
+chat_list_adapter = TypeAdapter(list[ChatResponse])
+message_list_adapter = TypeAdapter(list[MessageResponse])
+
+CHAT_COLUMNS = (
+    Chats.id,
+    Chats.user1_id,
+    Chats.user2_id,
+    Chats.is_group,
+    Chats.title,
+    Chats.created_at,
+)
+
+MESSAGE_COLUMNS = (
+    Messages.id,
+    Messages.chat_id,
+    Messages.sender_id,
+    Messages.content,
+    Messages.attachment_id,
+    Messages.created_at,
+)
+
+
+def chat_pair(user_a: UUID, user_b: UUID) -> tuple[UUID, UUID]:
+    """A chat between two users is stored once, with user1_id < user2_id."""
+    return (user_a, user_b) if user_a < user_b else (user_b, user_a)
 
 
-def get_all_user_chat(db: Session, user_id: UUID) -> list[ChatResponse]:
+def get_all_user_chat(
+    db: Session, user_id: UUID, read_at_overrides: dict[UUID, datetime] | None = None
+) -> list[ChatResponse]:
+    """The user's chats with unread counts. read_at_overrides maps chat ids
+    to watermarks newer than the stored ones, e.g. not flushed yet."""
     try:
-        chats = (
-            db.query(Chats)
-            .filter(or_(Chats.user1_id == user_id, Chats.user2_id == user_id))
+        last_read_at = ReadReceipts.last_read_at
+        if read_at_overrides:
+            last_read_at = case(
+                read_at_overrides, value=Chats.id, else_=ReadReceipts.last_read_at
+            )
+
+        unread_count = (
+            select(func.count(Messages.id))
+            .where(
+                Messages.chat_id == Chats.id,
+                Messages.sender_id != user_id,
+                or_(
+                    last_read_at.is_(None),
+                    Messages.created_at > last_read_at,
+                ),
+            )
+            .correlate(Chats, ReadReceipts)
+            .scalar_subquery()
+        )
+
+        rows = (
+            db.query(*CHAT_COLUMNS, unread_count.label("unread_count"))
+            .join(
+                ChatMembers,
+                and_(ChatMembers.chat_id == Chats.id, ChatMembers.user_id == user_id),
+            )
+            .outerjoin(
+                ReadReceipts,
+                and_(ReadReceipts.chat_id == Chats.id, ReadReceipts.user_id == user_id),
+            )
             .all()
         )
 
-        if not chats:
+        if not rows:
             logging.info(f"No chats found for user: {user_id}")
             return []
 
-        logging.info(f"Retrieved {len(chats)} chats for user: {user_id}")
-        return chats
+        logging.info(f"Retrieved {len(rows)} chats for user: {user_id}")
+        return chat_list_adapter.validate_python(rows, from_attributes=True)
 
     except Exception as e:
         logging.error(f"Error retrieving chats for user {user_id}: {e}")
@@ -37,22 +114,25 @@ def get_all_messages_for_chat(
     db: Session, chat_id: UUID, current_user_id: UUID
 ) -> list[MessageResponse]:
     try:
-        chat = db.query(Chats).filter(Chats.id == chat_id).first()
-
-        if not chat:
+        if not is_member(db, current_user_id, chat_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Message not found.",
             )
 
-        messages = db.query(Messages).filter(Messages.chat_id == chat_id).all()
+        rows = (
+            db.query(*MESSAGE_COLUMNS)
+            .filter(Messages.chat_id == chat_id)
+            .order_by(Messages.created_at)
+            .all()
+        )
 
-        if not messages:
+        if not rows:
             logging.info(f"No messages found for chat: {chat_id}")
             return []
 
-        logging.info(f"Retrieved {len(messages)} messages for chat: {chat_id}")
-        return messages
+        logging.info(f"Retrieved {len(rows)} messages for chat: {chat_id}")
+        return message_list_adapter.validate_python(rows, from_attributes=True)
 
     except HTTPException:
         raise
@@ -65,57 +145,262 @@ def get_all_messages_for_chat(
 
 
 def create_chat(db: Session, user1_id: UUID, user2_id: UUID) -> ChatResponse:
-    try:
-        chat = (
-            db.query(Chats)
-            .filter(Chats.user1_id == user1_id)
-            .filter(Chats.user2_id == user2_id)
-            .first()
+    """Create the chat between two users, or return it if it already exists."""
+    if user1_id == user2_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot create a chat with yourself",
         )
 
+    user1_id, user2_id = chat_pair(user1_id, user2_id)
+
+    try:
+        chat = db.execute(
+            insert(Chats)
+            .values(user1_id=user1_id, user2_id=user2_id)
+            .on_conflict_do_nothing(constraint="unique_chat_pair")
+            .returning(*CHAT_COLUMNS)
+        ).one_or_none()
+
         if chat:
-            logging.warning(f"Chat creating failed: Chat already exists: {chat.id}")
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Chat already exists",
+            db.execute(
+                insert(ChatMembers).values(
+                    [
+                        {"chat_id": chat.id, "user_id": user1_id},
+                        {"chat_id": chat.id, "user_id": user2_id},
+                    ]
+                )
+            )
+            db.commit()
+            logging.info(f"Successfully creating chat: {chat.id}")
+        else:
+            # lost the race or already there; the unique pair makes this exact
+            chat = (
+                db.query(*CHAT_COLUMNS)
+                .filter(Chats.user1_id == user1_id, Chats.user2_id == user2_id)
+                .one()
             )
+            logging.info(f"Chat already exists: {chat.id}")
 
-        new_chat = Chats(user1_id=user1_id, user2_id=user2_id)
+        return ChatResponse.model_validate(chat, from_attributes=True)
 
-        db.add(new_chat)
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Failed to create chat : {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create chat",
+        )
+
+
+def _insert_members(
+    db: Session, chat_id: UUID, user_ids: set[UUID], owner_id: UUID | None = None
+) -> list[UUID]:
+    # INSERT ... SELECT from users skips unknown ids instead of failing the batch
+    role = case((Users.id == owner_id, "owner"), else_="member")
+    return list(
+        db.execute(
+            insert(ChatMembers)
+            .from_select(
+                ["chat_id", "user_id", "role"],
+                select(
+                    literal(chat_id, ChatMembers.chat_id.type), Users.id, role
+                ).where(Users.id.in_(user_ids)),
+            )
+            .on_conflict_do_nothing(constraint="pk_chat_members")
+            .returning(ChatMembers.user_id)
+        ).scalars()
+    )
+
+
+def create_group_chat(
+    db: Session, owner_id: UUID, group_request: GroupCreateRequest
+) -> tuple[ChatResponse, list[UUID]]:
+    """Create a group chat owned by owner_id; returns it and its member ids."""
+    member_ids = set(group_request.member_ids) | {owner_id}
+    if len(member_ids) > GROUP_MAX_MEMBERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A group can have at most {GROUP_MAX_MEMBERS} members",
+        )
+
+    try:
+        chat = db.execute(
+            insert(Chats)
+            .values(is_group=True, title=group_request.title)
+            .returning(*CHAT_COLUMNS)
+        ).one()
+        added = _insert_members(db, chat.id, member_ids, owner_id)
         db.commit()
-        db.refresh(new_chat)
 
-        logging.info(f"Successfully creating chat: {new_chat.id}")
-        return new_chat
+        logging.info(f"Created group chat {chat.id} with {len(added)} members")
+        return ChatResponse.model_validate(chat, from_attributes=True), added
 
-    except HTTPException:
-        raise
     except Exception as e:
-        logging.error(f"Failed to create chat : {e}")
+        db.rollback()
+        logging.error(f"Failed to create group chat: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create chat",
         )
 
 
-def create_message(db: Session, message_request: MessageRequest) -> MessageResponse:
+def add_chat_members(
+    db: Session, chat_id: UUID, actor_id: UUID, user_ids: list[UUID]
+) -> list[UUID]:
+    """Add users to a group chat the actor belongs to; returns the new ones."""
+    chat = (
+        db.query(Chats.is_group)
+        .join(ChatMembers, ChatMembers.chat_id == Chats.id)
+        .filter(Chats.id == chat_id, ChatMembers.user_id == actor_id)
+        .first()
+    )
+    if not chat:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Chat not found."
+        )
+    if not chat.is_group:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Members can only be added to group chats",
+        )
+
+    count = db.query(func.count()).filter(ChatMembers.chat_id == chat_id).scalar()
+    if count + len(set(user_ids)) > GROUP_MAX_MEMBERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A group can have at most {GROUP_MAX_MEMBERS} members",
+        )
+
     try:
-        new_message = Messages(
-            chat_id=message_request.chat_id,
-            sender_id=message_request.sender_id,
-            content=message_request.content,
+        added = _insert_members(db, chat_id, set(user_ids))
+        db.commit()
+
+        logging.info(f"Added {len(added)} members to chat {chat_id}")
+        return added
+
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Failed to add members to chat {chat_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to add members.",
         )
 
-        db.add(new_message)
+
+def remove_chat_member(
+    db: Session, chat_id: UUID, actor_id: UUID, user_id: UUID
+) -> None:
+    """Members may leave a group; only its owner may remove someone else."""
+    actor = (
+        db.query(ChatMembers.role, Chats.is_group)
+        .join(Chats, Chats.id == ChatMembers.chat_id)
+        .filter(ChatMembers.chat_id == chat_id, ChatMembers.user_id == actor_id)
+        .first()
+    )
+    if not actor:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Chat not found."
+        )
+    if not actor.is_group:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Members can only be removed from group chats",
+        )
+    if user_id != actor_id and actor.role != "owner":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the group owner can remove other members",
+        )
+
+    try:
+        removed = db.execute(
+            delete(ChatMembers).where(
+                ChatMembers.chat_id == chat_id, ChatMembers.user_id == user_id
+            )
+        ).rowcount
+        db.commit()
+
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Failed to remove member from chat {chat_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to remove member.",
+        )
+
+    if not removed:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Member not found."
+        )
+    logging.info(f"Removed {user_id} from chat {chat_id}")
+
+
+def create_message(db: Session, message_request: MessageRequest) -> MessageResponse:
+    return create_messages(db, [message_request])[0]
+
+
+def create_messages(
+    db: Session, message_requests: list[MessageRequest], validate: bool = True
+) -> list[MessageResponse]:
+    """Insert a batch of messages with one statement and one commit.
+
+    Pass validate=False only when the caller already checked every sender
+    against the chat members and every attachment, as the WebSocket path
+    does per event so one bad event cannot fail the others.
+    """
+    if validate:
+        pairs = {(request.chat_id, request.sender_id) for request in message_requests}
+        members = set(
+            db.query(ChatMembers.chat_id, ChatMembers.user_id)
+            .filter(tuple_(ChatMembers.chat_id, ChatMembers.user_id).in_(pairs))
+            .all()
+        )
+        sendable = get_sendable_attachment_ids(
+            db,
+            {
+                (request.attachment_id, request.chat_id, request.sender_id)
+                for request in message_requests
+                if request.attachment_id
+            },
+        )
+
+        for message_request in message_requests:
+            if (message_request.chat_id, message_request.sender_id) not in members:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Chat not found.",
+                )
+            if (
+                message_request.attachment_id
+                and message_request.attachment_id not in sendable
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Attachment not found or not fully uploaded.",
+                )
+
+    try:
+        new_messages = db.execute(
+            insert(Messages).returning(*MESSAGE_COLUMNS, sort_by_parameter_order=True),
+            [
+                {
+                    "chat_id": message_request.chat_id,
+                    "sender_id": message_request.sender_id,
+                    "content": message_request.content,
+                    "attachment_id": message_request.attachment_id,
+                }
+                for message_request in message_requests
+            ],
+        ).all()
         db.commit()
-        db.refresh(new_message)
 
-        logging.info(f"Message created successfully in chat {message_request.chat_id}")
+        logging.info(f"{len(new_messages)} message(s) created successfully")
 
-        return new_message
+        return message_list_adapter.validate_python(new_messages, from_attributes=True)
 
     except Exception as e:
+        db.rollback()
         logging.error(f"Error creating message: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -123,9 +408,14 @@ def create_message(db: Session, message_request: MessageRequest) -> MessageRespo
         )
 
 
-def delete_message_by_id(db: Session, id: UUID) -> UUID:
+def delete_message_by_id(db: Session, id: UUID, user_id: UUID) -> UUID:
+    """Delete a message sent by user_id and return its chat id."""
     try:
-        message_to_delete = db.query(Messages).filter(Messages.id == id).first()
+        message_to_delete = (
+            db.query(Messages.chat_id, Messages.sender_id)
+            .filter(Messages.id == id)
+            .first()
+        )
 
         if not message_to_delete:
             raise HTTPException(
@@ -133,11 +423,16 @@ def delete_message_by_id(db: Session, id: UUID) -> UUID:
                 detail="Message not found",
             )
 
-        chat_id = message_to_delete.chat_id
-        db.delete(message_to_delete)
+        if message_to_delete.sender_id != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You can only delete your own messages",
+            )
+
+        db.execute(delete(Messages).where(Messages.id == id))
         db.commit()
 
-        return chat_id
+        return message_to_delete.chat_id
 
     except HTTPException:
         raise
@@ -148,19 +443,98 @@ def delete_message_by_id(db: Session, id: UUID) -> UUID:
         )
 
 
-def get_user_chats(db: Session, user_id: UUID) -> list[Chats]:
+def get_user_chat_ids(db: Session, user_id: UUID) -> list[UUID]:
     try:
-        chats = (
-            db.query(Chats)
-            .filter((Chats.user1_id == user_id) | (Chats.user2_id == user_id))
-            .all()
+        return list(
+            db.execute(
+                select(ChatMembers.chat_id).where(ChatMembers.user_id == user_id)
+            ).scalars()
         )
 
-        return chats
-
     except Exception as e:
         logging.error(f"Error retrieving chats for user {user_id}: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve chats.",
         )
+
+
+def get_chat_member_ids(db: Session, chat_ids) -> dict[UUID, list[UUID]]:
+    """Members of several chats in one query, keyed by chat id."""
+    members = defaultdict(list)
+    if not chat_ids:
+        return members
+
+    rows = db.execute(
+        select(ChatMembers.chat_id, ChatMembers.user_id).where(
+            ChatMembers.chat_id.in_(chat_ids)
+        )
+    )
+    for chat_id, user_id in rows:
+        members[chat_id].append(user_id)
+    return members
+
+
+def get_read_position(db: Session, chat_id: UUID, message_id: UUID | None = None):
+    """(id, created_at) of a message in the chat, or of its latest message.
+
+    Read watermarks are positioned by this, never by a client timestamp.
+    """
+    query = db.query(Messages.id, Messages.created_at).filter(
+        Messages.chat_id == chat_id
+    )
+    if message_id is not None:
+        return query.filter(Messages.id == message_id).first()
+    return query.order_by(Messages.created_at.desc()).first()
+
+
+def get_read_watermarks(db: Session, user_id: UUID) -> list[ReadReceipts]:
+    try:
+        return db.query(ReadReceipts).filter(ReadReceipts.user_id == user_id).all()
+
+    except Exception as e:
+        logging.error(f"Error retrieving read receipts for user {user_id}: {e}")
+        return []
+
+
+def upsert_read_watermarks(
+    db: Session, watermarks: list[tuple[UUID, UUID, UUID | None, datetime]]
+) -> None:
+    """Write (user_id, chat_id, message_id, read_at) rows in one statement.
+
+    Existing rows only move forward: an older read_at never overwrites a
+    newer one, so out-of-order flushes are harmless.
+    """
+    if not watermarks:
+        return
+
+    stmt = insert(ReadReceipts).values(
+        [
+            {
+                "user_id": user_id,
+                "chat_id": chat_id,
+                "last_read_message_id": message_id,
+                "last_read_at": read_at,
+            }
+            for user_id, chat_id, message_id, read_at in watermarks
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="pk_read_receipts",
+        set_={
+            "last_read_message_id": stmt.excluded.last_read_message_id,
+            "last_read_at": stmt.excluded.last_read_at,
+            "updated_at": func.now(),
+        },
+        where=ReadReceipts.last_read_at < stmt.excluded.last_read_at,
+    )
+
+    try:
+        db.execute(stmt)
+        db.commit()
+        logging.info(f"Flushed {len(watermarks)} read receipts")
+
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Failed to flush read receipts: {e}")
+        raise
@@ -1,81 +1,375 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
-from typing import Dict, List
+from fastapi import (
+    APIRouter,
+    WebSocket,
+    WebSocketDisconnect,
+    Depends,
+    HTTPException,
+    Query,
+)
+from typing import Dict, Set, Tuple
+import asyncio
 import json
+import logging
+import os
+from datetime import datetime
 from uuid import UUID
-from datetime import datetime, timezone
 
+from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from src.database.dbcore import get_db
+from src.admission.controller import Overloaded, admission
 from src.chats.service import (
-    get_user_chats,
-    create_message,
-)  # returns list of Chats objects
+    get_user_chat_ids,
+    get_chat_member_ids,
+    create_messages,
+    delete_message_by_id,
+    get_read_position,
+    get_read_watermarks,
+)
 from src.chats.schemas import MessageRequest
+from src.attachments.service import get_sendable_attachment_ids
+from src.chats.registry import ConnectionEntry, ConnectionRegistry
+from src.chats.connect_limiter import ConnectRateLimiter
+from src.chats.drain import reconnect_delay_ms
+from src.chats.presence import PresenceTracker
+from src.chats.receipts import ReadReceiptBuffer
+from src.notifications.worker import OfflineDeliveryWorker
+
+load_dotenv()
+
+# how long outbound events wait to be coalesced into one frame
+WS_COALESCE_MS = int(os.getenv("WS_COALESCE_MS", "20"))
+# upper bound on events per inbound array frame
+WS_MAX_BATCH_EVENTS = int(os.getenv("WS_MAX_BATCH_EVENTS", "100"))
 
 router = APIRouter(prefix="/ws", tags=["WebSocket"])
 
 
 class ConnectionManager:
     def __init__(self):
-        # user_id -> WebSocket
-        self.active_connections: Dict[UUID, WebSocket] = {}
-        # chat_id -> list of user_ids
-        self.active_chats: Dict[UUID, List[UUID]] = {}
+        # user_id -> set of open sockets (one per tab / device)
+        self.active_connections = ConnectionRegistry()
+        # chat_id -> member user_ids, for direct and group chats alike
+        self.active_chats: Dict[UUID, Set[UUID]] = {}
+        # user_id -> chat_ids, reverse of active_chats
+        self.user_chats: Dict[UUID, Set[UUID]] = {}
+        # chat_id -> (id, created_at) of the latest message stored through
+        # this process, so read events for it are positioned without a query
+        self.latest_messages: Dict[UUID, Tuple[UUID, datetime]] = {}
+        self.presence = PresenceTracker(self)
+        self.read_receipts = ReadReceiptBuffer()
+        self.offline_delivery = OfflineDeliveryWorker()
+        # batching connections with buffered frames, flushed by one timer so
+        # a large group fan-out schedules one task, not one per socket
+        self._coalescing: list[ConnectionEntry] = []
+        self._flush_task: asyncio.Task | None = None
+        self.connect_limiter = ConnectRateLimiter()
+        # set once shutdown starts; no new sockets are accepted after that
+        self.draining = False
 
-    async def connect(self, user_id: UUID, websocket: WebSocket, db: Session):
+    async def connect(
+        self,
+        user_id: UUID,
+        websocket: WebSocket,
+        db: Session,
+        batching: bool = False,
+    ):
         await websocket.accept()
-        self.active_connections[user_id] = websocket
+        first_socket = user_id not in self.active_connections
+        self.active_connections.add(user_id, websocket, batching)
         print(f"✅ User {user_id} connected")
 
-        # Register all chats this user belongs to
-        user_chats = get_user_chats(db, user_id)
-        for chat in user_chats:
-            participants = [chat.user1_id, chat.user2_id]
-            self.active_chats[chat.id] = participants
+        # Register all chats this user belongs to; members are only loaded
+        # for chats nobody online has loaded yet
+        chat_ids = get_user_chat_ids(db, user_id)
+        missing = [chat_id for chat_id in chat_ids if chat_id not in self.active_chats]
+        for chat_id, member_ids in get_chat_member_ids(db, missing).items():
+            self.track_chat(chat_id, member_ids)
+        for chat_id in chat_ids:
+            self.track_chat(chat_id, [user_id])
+
+        print(f"Active chats now: {len(self.active_chats)}")
 
-        print(f"Active chats now: {self.active_chats}")
+        self.presence.start()
+        self.read_receipts.start()
+        self.offline_delivery.start()
+        if first_socket:
+            self.presence.user_online(user_id)
+            for receipt in get_read_watermarks(db, user_id):
+                self.read_receipts.seed(
+                    user_id,
+                    receipt.chat_id,
+                    receipt.last_read_message_id,
+                    receipt.last_read_at,
+                )
+        await self.send_personal_message(
+            {
+                "event": "presence_snapshot",
+                "online": list(
+                    {
+                        str(other_id)
+                        for chat_id in self.chats_for_user(user_id)
+                        for other_id in self.active_chats.get(chat_id, [])
+                        if other_id != user_id and other_id in self.active_connections
+                    }
+                ),
+            },
+            user_id,
+        )
 
-    def disconnect(self, user_id: UUID):
-        if user_id in self.active_connections:
-            self.active_connections.pop(user_id)
+    def disconnect(self, user_id: UUID, websocket: WebSocket):
+        entry = self.active_connections.remove(websocket)
+        if entry is not None:
+            entry.pending = None
             print(f"❌ User {user_id} disconnected")
+            if user_id not in self.active_connections:
+                self.presence.user_offline(user_id)
+                self.read_receipts.forget(user_id, self.chats_for_user(user_id))
+
+    def chats_for_user(self, user_id: UUID) -> Set[UUID]:
+        return self.user_chats.get(user_id, set())
+
+    def track_chat(self, chat_id: UUID, member_ids):
+        """Add members to the in-memory index that fan-out reads from."""
+        intern = self.active_connections.intern
+        members = self.active_chats.setdefault(chat_id, set())
+        for member_id in member_ids:
+            member_id = intern(member_id)
+            members.add(member_id)
+            self.user_chats.setdefault(member_id, set()).add(chat_id)
+
+    def untrack_member(self, chat_id: UUID, user_id: UUID):
+        self.active_chats.get(chat_id, set()).discard(user_id)
+        self.chats_for_user(user_id).discard(chat_id)
+        self.presence.stop_typing(user_id, chat_id)
+
+    def is_member(self, db: Session, user_id: UUID, chat_id: UUID) -> bool:
+        members = self.active_chats.get(chat_id)
+        if members is None:
+            # not indexed yet: load it once, later checks stay in memory
+            member_ids = get_chat_member_ids(db, [chat_id]).get(chat_id)
+            if not member_ids:
+                return False
+            self.track_chat(chat_id, member_ids)
+            members = self.active_chats[chat_id]
+        return user_id in members
+
+    async def broadcast_to_chat(self, chat_id: UUID, payload: dict):
+        text = json.dumps(payload)
+        for user_id in self.active_chats.get(chat_id, []):
+            for entry in self.active_connections.entries(user_id):
+                await self._deliver(entry, text)
 
     async def send_personal_message(self, message: dict, user_id: UUID):
-        ws = self.active_connections.get(user_id)
-        if ws:
-            await ws.send_text(json.dumps(message))
+        entries = self.active_connections.entries(user_id)
+        if entries:
+            text = json.dumps(message)
+            for entry in entries:
+                await self._deliver(entry, text)
+
+    async def _deliver(self, entry: ConnectionEntry, text: str):
+        if not entry.batching:
+            await self._send(entry, text)
+            return
+
+        # batching clients get everything sent within WS_COALESCE_MS as one
+        # JSON array frame
+        if entry.pending is None:
+            entry.pending = []
+            self._coalescing.append(entry)
+            if self._flush_task is None:
+                self._flush_task = asyncio.get_running_loop().create_task(
+                    self._flush_later()
+                )
+        entry.pending.append(text)
+
+    async def _flush_later(self):
+        await asyncio.sleep(WS_COALESCE_MS / 1000)
+        await self.flush_coalesced()
+
+    async def flush_coalesced(self):
+        entries, self._coalescing, self._flush_task = self._coalescing, [], None
+        for entry in entries:
+            # pending is dropped on disconnect
+            pending, entry.pending = entry.pending, None
+            if pending:
+                await self._send(entry, "[" + ",".join(pending) + "]")
 
-    async def send_message_to_chat(
+    async def _send(self, entry: ConnectionEntry, text: str):
+        # one dead peer must not stop a fan-out or fail the sender's request;
+        # drop it here, its own endpoint loop finds the socket closed later
+        try:
+            await entry.websocket.send_text(text)
+        except Exception as e:
+            logging.warning(f"Send to {entry.user_id} failed, dropping socket: {e}")
+            self.disconnect(entry.user_id, entry.websocket)
+
+    async def send_messages(
         self,
-        chat_id: UUID,
-        message: dict,
         sender_id: UUID,
-        message_id: UUID,
+        messages: list[tuple[UUID, UUID, str, UUID | None]],
         db: Session,
-        content: str,
     ):
-        users = self.active_chats.get(chat_id, [])
-        print(f"📤 Sending message to chat {chat_id}: {users}")
+        """Persist (chat_id, client_message_id, content, attachment_id) tuples
+        in one commit, then fan each one out to its chat.
 
-        message_data = MessageRequest(
-            chat_id=chat_id, sender_id=sender_id, content=content
+        A message for a chat the sender is not in, or with an attachment it
+        may not send, is reported back to the sender on its own and left out
+        of the batch, so it cannot cost the rest of the frame. Events carry
+        the id the database assigned, which is what deletes and read
+        receipts refer to; the client's own id is echoed back as
+        client_message_id so it can match its optimistic copy.
+        """
+        sendable = get_sendable_attachment_ids(
+            db,
+            {
+                (attachment_id, chat_id, sender_id)
+                for chat_id, _, _, attachment_id in messages
+                if attachment_id
+            },
         )
 
-        create_message(db, message_data)
+        accepted = []
+        for message in messages:
+            chat_id, client_message_id, _, attachment_id = message
+            if not self.is_member(db, sender_id, chat_id):
+                error = "Chat not found."
+            elif attachment_id and attachment_id not in sendable:
+                error = "Attachment not found or not fully uploaded."
+            else:
+                accepted.append(message)
+                continue
+            await self.send_personal_message(
+                {
+                    "error": error,
+                    "chat_id": str(chat_id),
+                    "client_message_id": str(client_message_id),
+                },
+                sender_id,
+            )
+        if not accepted:
+            return
+
+        created = create_messages(
+            db,
+            [
+                MessageRequest(
+                    chat_id=chat_id,
+                    sender_id=sender_id,
+                    content=content,
+                    attachment_id=attachment_id,
+                )
+                for chat_id, _, content, attachment_id in accepted
+            ],
+            validate=False,
+        )
+
+        for message, (_, client_message_id, _, _) in zip(created, accepted):
+            await self.publish_message(
+                sender_id,
+                message.chat_id,
+                message.id,
+                message.content,
+                message.attachment_id,
+                message.created_at,
+                client_message_id=client_message_id,
+            )
+
+    async def publish_message(
+        self,
+        sender_id: UUID,
+        chat_id: UUID,
+        message_id: UUID,
+        content: str,
+        attachment_id: UUID | None,
+        created_at: datetime,
+        client_message_id: UUID | None = None,
+    ):
+        """Fan a stored message out to online members and queue digests."""
+        self.note_message(chat_id, message_id, created_at)
+        users = self.active_chats.get(chat_id, ())
+        logging.debug(f"📤 Sending message to chat {chat_id}: {len(users)} members")
 
         payload = {
             "event": "message_new",
             "chat_id": str(chat_id),
             "sender_id": str(sender_id),
-            "content": message["content"],
+            "content": content,
+            "attachment_id": str(attachment_id) if attachment_id else None,
             "message_id": str(message_id),
-            "created_at": datetime.now(timezone.utc).isoformat(),
+            "client_message_id": (
+                str(client_message_id) if client_message_id else None
+            ),
+            "created_at": created_at.isoformat(),
         }
 
-        for user_id in users:
-            ws = self.active_connections.get(user_id)
-            if ws:
-                await ws.send_text(json.dumps(payload))
+        await self.broadcast_to_chat(chat_id, payload)
+
+        # offline participants get it later in a digest; no I/O here, and
+        # repeated messages to a chat coalesce into one entry per member
+        online = self.active_connections
+        self.offline_delivery.enqueue_many(
+            (
+                user_id
+                for user_id in users
+                if user_id != sender_id and user_id not in online
+            ),
+            "message_new",
+            payload,
+        )
+
+    def note_message(self, chat_id: UUID, message_id: UUID, created_at: datetime):
+        """Remember a stored message if it is the chat's latest so far."""
+        latest = self.latest_messages.get(chat_id)
+        if latest is None or latest[1] <= created_at:
+            self.latest_messages[chat_id] = (message_id, created_at)
+
+    async def mark_read(
+        self,
+        chat_id: UUID,
+        user_id: UUID,
+        message_id: UUID | None,
+        db: Session,
+    ):
+        """Record a read watermark and tell the chat, if it moved forward.
+
+        The position is the read message's created_at (the latest message
+        when message_id is None), so reading an older message is a no-op.
+        The latest message of a chat is known from publish_message; only an
+        older, uncached message_id costs a query.
+        """
+        if user_id not in self.active_chats.get(chat_id, ()):
+            return
+
+        latest = self.latest_messages.get(chat_id)
+        if latest is not None and (message_id is None or message_id == latest[0]):
+            position_id, created_at = latest
+        else:
+            if latest is not None:
+                # already past the latest message: nothing older can move it
+                read_at = self.read_receipts.read_at(user_id, chat_id)
+                if read_at is not None and read_at >= latest[1]:
+                    return
+            position = get_read_position(db, chat_id, message_id)
+            if position is None:
+                return
+            position_id, created_at = position.id, position.created_at
+            if message_id is None:
+                self.latest_messages[chat_id] = (position_id, created_at)
+
+        read_at = self.read_receipts.advance(user_id, chat_id, position_id, created_at)
+        if read_at is None:
+            return
+
+        payload = {
+            "event": "message_read",
+            "chat_id": str(chat_id),
+            "user_id": str(user_id),
+            "message_id": str(position_id),
+            "read_at": read_at.isoformat(),
+        }
+
+        await self.broadcast_to_chat(chat_id, payload)
 
     async def send_message_deleted(
         self,
@@ -83,8 +377,10 @@ class ConnectionManager:
         message_id: UUID,
     ):
         """Notify all chat members that a message was deleted."""
-        users = self.active_chats.get(chat_id, [])
         print(f"🗑️ Deleting message {message_id} in chat {chat_id}")
+        latest = self.latest_messages.get(chat_id)
+        if latest is not None and latest[0] == message_id:
+            del self.latest_messages[chat_id]
 
         payload = {
             "event": "message_deleted",
@@ -92,60 +388,237 @@ class ConnectionManager:
             "message_id": str(message_id),
         }
 
-        for user_id in users:
-            ws = self.active_connections.get(user_id)
-            if ws:
-                await ws.send_text(json.dumps(payload))
+        await self.broadcast_to_chat(chat_id, payload)
+
+    async def send_members_changed(
+        self,
+        chat_id: UUID,
+        added: list[UUID] = (),
+        removed: list[UUID] = (),
+    ):
+        """Update the membership index and tell the chat, removed users included."""
+        # a chat that is not indexed yet is loaded whole on first use instead
+        if chat_id in self.active_chats:
+            self.track_chat(chat_id, added)
+        payload = {
+            "event": "chat_members",
+            "chat_id": str(chat_id),
+            "added": [str(user_id) for user_id in added],
+            "removed": [str(user_id) for user_id in removed],
+        }
+        await self.broadcast_to_chat(chat_id, payload)
+        for user_id in removed:
+            self.untrack_member(chat_id, user_id)
+
+    async def drain(self):
+        """Stop accepting sockets, write out everything buffered, then send
+        each client server_going_away with a jittered delay and close it."""
+        if self.draining:
+            return
+        self.draining = True
+
+        entries = self.active_connections.all_entries()
+        logging.info(f"Draining {len(entries)} WebSocket connections")
+
+        await self.flush_coalesced()
+        await self.read_receipts.stop()
+        await self.offline_delivery.stop()
+        await self.presence.stop()
+
+        for entry in entries:
+            await send_going_away(
+                entry.websocket, "Server restarting", code=1012, batching=entry.batching
+            )
 
 
 manager = ConnectionManager()
 
 
+async def send_going_away(
+    websocket: WebSocket,
+    reason: str,
+    code: int,
+    batching: bool = False,
+    accept: bool = False,
+    min_delay_ms: int | None = None,
+):
+    """Tell a client when to come back, then close its socket."""
+    text = json.dumps(
+        {
+            "event": "server_going_away",
+            "reason": reason,
+            "reconnect_after_ms": reconnect_delay_ms(min_delay_ms),
+        }
+    )
+    try:
+        if accept:
+            await websocket.accept()
+        await websocket.send_text(f"[{text}]" if batching else text)
+        await websocket.close(code=code, reason=reason)
+    except Exception as e:
+        # already gone; nothing left to tell it
+        logging.debug(f"Could not send server_going_away: {e}")
+
+
+async def handle_client_event(user_id: UUID, data: dict, db: Session):
+    """Apply one inbound event. A message_new is returned instead of sent, so
+    the caller can persist every message of a frame in one commit."""
+    chat_id = UUID(data.get("chat_id"))
+    event_type = data.get("event")
+    content = data.get("content")
+
+    # ephemeral events: never persisted, coalesced per tick
+    if event_type == "typing":
+        manager.presence.typing(user_id, chat_id)
+        return None
+    if event_type == "typing_stop":
+        manager.presence.stop_typing(user_id, chat_id)
+        return None
+    if event_type == "message_read":
+        # any client read_at is ignored; the server positions the watermark
+        message_id = data.get("message_id")
+        await manager.mark_read(
+            chat_id,
+            user_id,
+            message_id=UUID(message_id) if message_id else None,
+            db=db,
+        )
+        return None
+
+    attachment_id = data.get("attachment_id")
+    attachment_id = UUID(attachment_id) if attachment_id else None
+
+    if not chat_id or not (content or attachment_id):
+        await manager.send_personal_message(
+            {"error": "Invalid message format"}, user_id
+        )
+        return None
+
+    if event_type == "message_new":
+        content = data.get("content") or ""
+        message_id = UUID(data.get("message_id"))
+        return (chat_id, message_id, content, attachment_id)
+
+    # 🗑️ Message delete event: only the sender may delete, same as over REST
+    if event_type == "message_delete":
+        message_id = UUID(data.get("message_id"))
+        chat_id = delete_message_by_id(db, message_id, user_id)
+        await manager.send_message_deleted(chat_id, message_id)
+    return None
+
+
+async def handle_client_frame(user_id: UUID, events: list, db: Session):
+    new_messages = []
+    for event in events:
+        try:
+            new_message = await handle_client_event(user_id, event, db)
+            if new_message is not None:
+                new_messages.append(new_message)
+        except (ValueError, TypeError, AttributeError):
+            await manager.send_personal_message(
+                {"error": "Invalid message format"}, user_id
+            )
+        except HTTPException as e:
+            await manager.send_personal_message({"error": e.detail}, user_id)
+        except Exception as e:
+            # e.g. the DB went away: answer this event, keep the socket
+            logging.error(f"Event from {user_id} failed: {e}")
+            db.rollback()
+            await manager.send_personal_message(
+                {"error": "Internal server error"}, user_id
+            )
+
+    if new_messages:
+        try:
+            await manager.send_messages(user_id, new_messages, db)
+        except HTTPException as e:
+            await manager.send_personal_message({"error": e.detail}, user_id)
+        except Exception as e:
+            logging.error(f"Sending messages from {user_id} failed: {e}")
+            db.rollback()
+            await manager.send_personal_message(
+                {"error": "Internal server error"}, user_id
+            )
+
+
 @router.websocket("/{user_id}")
 async def websocket_endpoint(
-    websocket: WebSocket, user_id: UUID, db: Session = Depends(get_db)
+    websocket: WebSocket,
+    user_id: UUID,
+    features: str = Query(""),
+    db: Session = Depends(get_db),
 ):
-    await manager.connect(user_id, websocket, db)
+    # clients opt in with ?features=batch; they may then send arrays of
+    # events and receive arrays back. Everyone else keeps one event per frame.
+    batching = "batch" in features.split(",")
+    user_id = manager.active_connections.intern(user_id)
+
+    # a reconnect wave after a restart is smoothed here, before any DB work
+    if not manager.draining and not await manager.connect_limiter.acquire():
+        await send_going_away(
+            websocket,
+            "Too many connections",
+            code=1013,
+            batching=batching,
+            accept=True,
+            min_delay_ms=int(manager.connect_limiter.backlog_seconds() * 1000),
+        )
+        return
+    if manager.draining:
+        await send_going_away(
+            websocket, "Server restarting", code=1012, batching=batching, accept=True
+        )
+        return
+
+    # connect() registers the socket before it loads chats, so every way out
+    # from here on must unregister it, or the user would stay online
     try:
+        try:
+            async with admission.slot("read"):
+                await manager.connect(user_id, websocket, db, batching)
+        except Overloaded:
+            await send_going_away(
+                websocket, "Server is busy", code=1013, batching=batching, accept=True
+            )
+            return
+        finally:
+            # give the pooled connection back; the session reopens on next use
+            db.close()
+        if batching:
+            await manager.send_personal_message(
+                {"event": "session", "features": ["batch"]}, user_id
+            )
         while True:
             raw_data = await websocket.receive_text()
             try:
                 data = json.loads(raw_data)
-                chat_id = UUID(data.get("chat_id"))
-                event_type = data.get("event")
-                content = data.get("content")
-
-                if not chat_id or not content:
-                    await manager.send_personal_message(
-                        {"error": "Invalid message format"}, user_id
-                    )
-                    continue
-
-                if event_type == "message_new":
-                    content = data.get("content")
-                    message_id = UUID(data.get("message_id"))
-                    await manager.send_message_to_chat(
-                        chat_id,
-                        {"content": content},
-                        sender_id=user_id,
-                        message_id=message_id,
-                        db=db,
-                        content=content,
-                    )
-
-                # 🗑️ Message delete event (optional if you want to handle delete via WS too)
-                elif event_type == "message_delete":
-                    message_id = UUID(data.get("message_id"))
-                    await manager.send_message_deleted(chat_id, message_id)
-                # Echo message to all chat participants (including sender)
-                # await manager.send_message_to_chat(
-                #     chat_id, {"content": content}, sender_id=user_id
-                # )
-
             except json.JSONDecodeError:
                 await manager.send_personal_message(
                     {"error": "Invalid JSON format"}, user_id
                 )
+                continue
+
+            events = data if batching and isinstance(data, list) else [data]
+            if len(events) > WS_MAX_BATCH_EVENTS:
+                await manager.send_personal_message(
+                    {"error": f"At most {WS_MAX_BATCH_EVENTS} events per frame"},
+                    user_id,
+                )
+                continue
+
+            # realtime is the highest admission class, ahead of bulk reads
+            try:
+                async with admission.slot("realtime"):
+                    await handle_client_frame(user_id, events, db)
+            except Overloaded as e:
+                await manager.send_personal_message(
+                    {"error": "Server is busy", "retry_after": e.retry_after},
+                    user_id,
+                )
+            finally:
+                db.close()
 
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
+        pass
+    finally:
+        manager.disconnect(user_id, websocket)
@@ -0,0 +1,63 @@
+import base64
+import os
+import zlib
+
+from dotenv import load_dotenv
+from sqlalchemy import Text
+from sqlalchemy.types import TypeDecorator
+
+load_dotenv()
+
+MESSAGE_COMPRESS_MIN_BYTES = int(os.getenv("MESSAGE_COMPRESS_MIN_BYTES", "1024"))
+MESSAGE_COMPRESS_LEVEL = int(os.getenv("MESSAGE_COMPRESS_LEVEL", "6"))
+
+# Stored values that start with MARKER carry a codec tag:
+#   "\x1bz1:" + base64(zlib(utf-8))   compressed, codec version 1
+#   "\x1bp0:" + text                  plain text that itself starts with MARKER
+# Anything else is plain text, so rows written before this codec still read,
+# including legacy values that happen to start with ESC (ANSI colour codes).
+MARKER = "\x1b"
+ZLIB_V1 = MARKER + "z1:"
+PLAIN_V0 = MARKER + "p0:"
+
+
+def encode_text(value: str | None, min_bytes: int = MESSAGE_COMPRESS_MIN_BYTES):
+    if value is None:
+        return None
+
+    raw = value.encode("utf-8")
+    if len(raw) >= min_bytes:
+        packed = base64.b64encode(zlib.compress(raw, MESSAGE_COMPRESS_LEVEL))
+        if len(packed) + len(ZLIB_V1) < len(raw):
+            return ZLIB_V1 + packed.decode("ascii")
+
+    if value.startswith(MARKER):
+        return PLAIN_V0 + value
+    return value
+
+
+def decode_text(value: str | None):
+    if value is None or not value.startswith(MARKER):
+        return value
+    if value.startswith(ZLIB_V1):
+        return zlib.decompress(base64.b64decode(value[len(ZLIB_V1) :])).decode("utf-8")
+    if value.startswith(PLAIN_V0):
+        return value[len(PLAIN_V0) :]
+    return value
+
+
+class CompressedText(TypeDecorator):
+    """Text column that zlib-compresses values above a size threshold.
+
+    Encoding and decoding happen on bind and on fetch, for ORM and Core
+    statements alike, so callers only ever see plain strings.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return encode_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decode_text(value)
@@ -1,24 +1,130 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.selectable import Select
+from starlette.requests import HTTPConnection
+from collections import Counter
+import hashlib
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 DATABASE_URL = os.getenv("POSTGRES_URL")
+REPLICA_DATABASE_URL = os.getenv("POSTGRES_REPLICA_URL")
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
 
 engine = create_engine(DATABASE_URL, echo=True, future=True)
+replica_engine = (
+    create_engine(REPLICA_DATABASE_URL, echo=True, future=True)
+    if REPLICA_DATABASE_URL
+    else None
+)
 
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+# routing decisions since startup, see /metrics/db
+routing_metrics: Counter = Counter()
+
+# client key -> monotonic time until which its reads stay on the primary
+_recent_writers: dict[str, float] = {}
+
+
+def _is_write(clause) -> bool:
+    if clause is None or isinstance(clause, UpdateBase):
+        return True
+    if isinstance(clause, Select):
+        return clause._for_update_arg is not None
+    # text() and anything else we can't inspect goes to the primary
+    return True
+
+
+class RoutingSession(Session):
+    """Sends plain SELECTs to the replica when the session allows it.
+
+    Writes, flushes, SELECT ... FOR UPDATE and raw SQL always use the
+    primary. Once a session writes, it stays on the primary, and so does
+    its client for REPLICA_STICKY_SECONDS after the commit, so users read
+    their own writes despite replication lag.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if replica_engine is None or not self.info.get("read_only"):
+            routing_metrics["primary"] += 1
+            return engine
+
+        if self._flushing or _is_write(clause):
+            self.info["wrote"] = True
+            routing_metrics["primary_write"] += 1
+            return engine
+
+        if self.info.get("wrote") or self._is_sticky():
+            routing_metrics["primary_sticky"] += 1
+            return engine
+
+        routing_metrics["replica"] += 1
+        return replica_engine
+
+    def _is_sticky(self) -> bool:
+        key = self.info.get("client_key")
+        until = _recent_writers.get(key) if key else None
+        if until is None:
+            return False
+        if until < time.monotonic():
+            _recent_writers.pop(key, None)
+            return False
+        return True
+
+    def commit(self):
+        super().commit()
+        key = self.info.get("client_key")
+        if key and (self.info.get("wrote") or not self.info.get("read_only")):
+            now = time.monotonic()
+            if len(_recent_writers) > 10_000:
+                for stale in [k for k, until in _recent_writers.items() if until < now]:
+                    del _recent_writers[stale]
+            _recent_writers[key] = now + REPLICA_STICKY_SECONDS
+
+
+SessionLocal = sessionmaker(
+    bind=engine, class_=RoutingSession, autocommit=False, autoflush=False
+)
 
 Base = declarative_base()
 
 
-def get_db():
+def _client_key(connection: HTTPConnection) -> str | None:
+    token = connection.headers.get("authorization")
+    if token:
+        return hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+    if connection.client:
+        return connection.client.host
+    return None
+
+
+def get_db(connection: HTTPConnection):
     db = SessionLocal()
+    # only safe HTTP methods may read from the replica
+    db.info["read_only"] = connection.scope.get("method") in ("GET", "HEAD")
+    db.info["client_key"] = _client_key(connection)
     try:
         yield db
     finally:
         db.close()
 
 
-from src.entities import users, messages, chats
+def get_routing_metrics() -> dict:
+    return {
+        "replica_configured": replica_engine is not None,
+        "sticky_clients": len(_recent_writers),
+        **routing_metrics,
+    }
+
+
+from src.entities import (
+    users,
+    messages,
+    chats,
+    chat_members,
+    read_receipts,
+    outbox,
+    attachments,
+)
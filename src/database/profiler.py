@@ -0,0 +1,119 @@
+import logging
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+load_dotenv()
+
+DB_PROFILE = os.getenv("DB_PROFILE", "").lower() in ("1", "true", "yes")
+DB_PROFILE_SLOW_MS = float(os.getenv("DB_PROFILE_SLOW_MS", "100"))
+DB_PROFILE_QUERY_BUDGET = int(os.getenv("DB_PROFILE_QUERY_BUDGET", "20"))
+
+logger = logging.getLogger("db.profiler")
+
+
+class RequestStats:
+    __slots__ = ("count", "total_ms", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements: Counter = Counter()
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("db_request_stats", default=None)
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    # plain EXPLAIN on a separate raw cursor (no re-execution, no events),
+    # wrapped in a savepoint so a failure cannot abort the request's transaction
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT db_profiler_explain")
+        try:
+            cursor.execute("EXPLAIN " + statement, parameters)
+            plan = "\n".join(str(row[0]) for row in cursor.fetchall())
+            cursor.execute("RELEASE SAVEPOINT db_profiler_explain")
+            return plan
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT db_profiler_explain")
+            return f"<explain failed: {e}>"
+    except Exception as e:
+        return f"<explain failed: {e}>"
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.total_ms += elapsed_ms
+        stats.statements[statement] += 1
+
+    if elapsed_ms > DB_PROFILE_SLOW_MS:
+        plan = ""
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            plan = "\n" + _explain(conn, statement, parameters)
+        logger.warning(f"Slow query ({elapsed_ms:.1f} ms): {statement}{plan}")
+
+
+def instrument_engine(engine: Engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class DbProfilerMiddleware:
+    """Counts and times the statements run while serving each HTTP request.
+
+    The totals go out in a Server-Timing header. Requests that run more
+    than DB_PROFILE_QUERY_BUDGET statements are logged with their most
+    repeated statements, which is what an N+1 lazy load looks like.
+    """
+
+    def __init__(self, app, query_budget: int = DB_PROFILE_QUERY_BUDGET):
+        self.app = app
+        self.query_budget = query_budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                timing = f'db;dur={stats.total_ms:.2f};desc="{stats.count} queries"'
+                if stats.count > self.query_budget:
+                    timing += ', db-budget;desc="exceeded"'
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if stats.count > self.query_budget:
+                top = "\n".join(
+                    f"  {n}x {statement}"
+                    for statement, n in stats.statements.most_common(3)
+                )
+                logger.warning(
+                    f"{scope['method']} {scope['path']} ran {stats.count} queries "
+                    f"(budget {self.query_budget}, {stats.total_ms:.1f} ms):\n{top}"
+                )
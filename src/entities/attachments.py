@@ -0,0 +1,29 @@
+from src.database.dbcore import Base
+from sqlalchemy import Column, String, BigInteger, DateTime, func, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+
+
+class Attachments(Base):
+    __tablename__ = "attachments"
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        unique=True,
+        nullable=False,
+    )
+
+    uploader_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    chat_id = Column(UUID(as_uuid=True), ForeignKey("chats.id"), nullable=False)
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(255), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    received = Column(BigInteger, nullable=False, server_default="0")
+    storage_key = Column(String(255), nullable=False)
+
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    completed_at = Column(DateTime(timezone=True), nullable=True)
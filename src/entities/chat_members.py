@@ -0,0 +1,31 @@
+from src.database.dbcore import Base
+from sqlalchemy import (
+    Column,
+    String,
+    DateTime,
+    func,
+    ForeignKey,
+    Index,
+    PrimaryKeyConstraint,
+)
+from sqlalchemy.dialects.postgresql import UUID
+
+
+class ChatMembers(Base):
+    __tablename__ = "chat_members"
+
+    chat_id = Column(
+        UUID(as_uuid=True), ForeignKey("chats.id", ondelete="CASCADE"), nullable=False
+    )
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    # "owner" may remove other members; everyone may leave
+    role = Column(String(16), nullable=False, server_default="member")
+
+    joined_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        PrimaryKeyConstraint("chat_id", "user_id", name="pk_chat_members"),
+        Index("ix_chat_members_user_id", "user_id", "chat_id"),
+    )
@@ -1,12 +1,15 @@
 from src.database.dbcore import Base
 from sqlalchemy import (
+    Boolean,
     Column,
     Integer,
+    String,
     DateTime,
     func,
     ForeignKey,
     Index,
     UniqueConstraint,
+    CheckConstraint,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -24,8 +27,11 @@ class Chats(Base):
         nullable=False,
     )
 
-    user1_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    user2_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    # set for direct chats only; membership of every chat is in chat_members
+    user1_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    user2_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    is_group = Column(Boolean, nullable=False, server_default="false")
+    title = Column(String(100), nullable=True)
 
     created_at = Column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
@@ -37,5 +43,9 @@ class Chats(Base):
 
     __table_args__ = (
         Index("ix_messages_id_created_at", "id", "created_at"),
+        # pairs are stored ordered (see chat_pair), so A-B and B-A are one row;
+        # the unique index serves user1_id lookups, ix_chats_user2_id the rest
         UniqueConstraint("user1_id", "user2_id", name="unique_chat_pair"),
+        CheckConstraint("user1_id < user2_id", name="ck_chats_ordered_pair"),
+        Index("ix_chats_user2_id", "user2_id", "user1_id"),
     )
@@ -1,5 +1,6 @@
 from src.database.dbcore import Base
-from sqlalchemy import Column, Integer, DateTime, func, ForeignKey, Text
+from src.database.codecs import CompressedText
+from sqlalchemy import Column, Integer, DateTime, func, ForeignKey, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -18,7 +19,10 @@ class Messages(Base):
 
     chat_id = Column(UUID(as_uuid=True), ForeignKey("chats.id"), nullable=False)
     sender_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    content = Column(Text, nullable=True)
+    content = Column(CompressedText, nullable=True)
+    attachment_id = Column(
+        UUID(as_uuid=True), ForeignKey("attachments.id"), nullable=True
+    )
 
     created_at = Column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
@@ -26,3 +30,5 @@ class Messages(Base):
 
     chat = relationship("Chats", back_populates="messages")
     sender = relationship("Users", back_populates="sent_messages")
+
+    __table_args__ = (Index("ix_messages_chat_id_created_at", "chat_id", "created_at"),)
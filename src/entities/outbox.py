@@ -0,0 +1,40 @@
+from src.database.dbcore import Base
+from sqlalchemy import Column, String, Integer, DateTime, Text, func, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+import uuid
+
+
+class OutboxEvents(Base):
+    __tablename__ = "outbox_events"
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        unique=True,
+        nullable=False,
+    )
+
+    recipient_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    event_type = Column(String(50), nullable=False)
+    payload = Column(JSONB, nullable=False)
+
+    attempts = Column(Integer, nullable=False, server_default="0")
+    next_attempt_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    last_error = Column(Text, nullable=True)
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+    failed_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        Index(
+            "ix_outbox_events_pending",
+            "next_attempt_at",
+            postgresql_where=(delivered_at.is_(None) & failed_at.is_(None)),
+        ),
+    )
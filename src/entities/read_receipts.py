@@ -0,0 +1,23 @@
+from src.database.dbcore import Base
+from sqlalchemy import Column, DateTime, func, ForeignKey, PrimaryKeyConstraint
+from sqlalchemy.dialects.postgresql import UUID
+
+
+class ReadReceipts(Base):
+    __tablename__ = "read_receipts"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    chat_id = Column(UUID(as_uuid=True), ForeignKey("chats.id"), nullable=False)
+    last_read_message_id = Column(UUID(as_uuid=True), nullable=True)
+    last_read_at = Column(DateTime(timezone=True), nullable=False)
+
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+    __table_args__ = (
+        PrimaryKeyConstraint("user_id", "chat_id", name="pk_read_receipts"),
+    )
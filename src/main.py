@@ -1,16 +1,36 @@
+from contextlib import asynccontextmanager
 from typing import List
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
 from fastapi import FastAPI, WebSocket, Request, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from src.database.dbcore import Base, engine
+from src.database.dbcore import Base, engine, replica_engine
+from src.database.profiler import DB_PROFILE, DbProfilerMiddleware, instrument_engine
+from src.admission.controller import ADMISSION_ENABLED, AdmissionMiddleware
 from src.api import register_routes
+from src.chats.drain import WS_DRAIN_ON_SIGTERM, install_sigterm_drain
+from src.chats.websocket import manager
+from src.responses import FastJSONResponse
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WS_DRAIN_ON_SIGTERM:
+        install_sigterm_drain(manager)
+    yield
+    # no-op after a SIGTERM drain; otherwise still flushes buffered writes
+    await manager.drain()
+
+
+app = FastAPI(default_response_class=FastJSONResponse, lifespan=lifespan)
 templates = Jinja2Templates(directory="templates")
 
 Base.metadata.create_all(bind=engine)
 
+# added before CORS so that 503s still carry CORS headers
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
 origins = ["http://localhost:5173", "https://messagetesttask.netlify.app"]
 
 app.add_middleware(
@@ -21,6 +41,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if DB_PROFILE:
+    instrument_engine(engine)
+    if replica_engine is not None:
+        instrument_engine(replica_engine)
+    app.add_middleware(DbProfilerMiddleware)
+
 register_routes(app)
 
 
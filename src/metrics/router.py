@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+from starlette import status
+from src.database.dbcore import get_routing_metrics
+from src.admission.controller import admission
+from src.chats.websocket import manager
+
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/db", status_code=status.HTTP_200_OK)
+async def get_db_metrics():
+    return get_routing_metrics()
+
+
+@router.get("/admission", status_code=status.HTTP_200_OK)
+async def get_admission_metrics():
+    return admission.metrics()
+
+
+@router.get("/ws", status_code=status.HTTP_200_OK)
+async def get_ws_metrics():
+    return {
+        "connections": len(manager.active_connections),
+        "users": manager.active_connections.user_count(),
+        "draining": manager.draining,
+        "connect_limiter": manager.connect_limiter.metrics(),
+    }
@@ -0,0 +1,117 @@
+from src.entities.outbox import OutboxEvents
+import logging
+from sqlalchemy.orm import Session
+from sqlalchemy import case, func, insert, select, update
+from uuid import UUID
+
+
+def insert_outbox_events(db: Session, events: list[tuple[UUID, str, dict]]) -> None:
+    if not events:
+        return
+
+    try:
+        db.execute(
+            insert(OutboxEvents),
+            [
+                {
+                    "recipient_id": recipient_id,
+                    "event_type": event_type,
+                    "payload": payload,
+                }
+                for recipient_id, event_type, payload in events
+            ],
+        )
+        db.commit()
+
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Failed to write {len(events)} outbox events: {e}")
+        raise
+
+
+def claim_due_events(db: Session, limit: int, lease_seconds: float) -> list:
+    """Lease up to `limit` due events to this worker.
+
+    The lease pushes next_attempt_at forward, so a crashed worker's
+    events are picked up again once it expires. SKIP LOCKED lets several
+    workers claim concurrently without overlap.
+    """
+    due = (
+        select(OutboxEvents.id)
+        .where(
+            OutboxEvents.delivered_at.is_(None),
+            OutboxEvents.failed_at.is_(None),
+            OutboxEvents.next_attempt_at <= func.now(),
+        )
+        .order_by(OutboxEvents.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(OutboxEvents)
+        .where(OutboxEvents.id.in_(due.scalar_subquery()))
+        .values(
+            next_attempt_at=func.now()
+            + func.make_interval(0, 0, 0, 0, 0, 0, lease_seconds)
+        )
+        .returning(
+            OutboxEvents.id,
+            OutboxEvents.recipient_id,
+            OutboxEvents.event_type,
+            OutboxEvents.payload,
+            OutboxEvents.attempts,
+        )
+    )
+
+    try:
+        rows = db.execute(stmt, execution_options={"synchronize_session": False}).all()
+        db.commit()
+        return rows
+
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Failed to claim outbox events: {e}")
+        raise
+
+
+def mark_delivered(db: Session, ids: list[UUID]) -> None:
+    if not ids:
+        return
+
+    db.execute(
+        update(OutboxEvents)
+        .where(OutboxEvents.id.in_(ids))
+        .values(delivered_at=func.now(), last_error=None),
+        execution_options={"synchronize_session": False},
+    )
+    db.commit()
+
+
+def mark_failed(
+    db: Session,
+    ids: list[UUID],
+    error: str,
+    backoff_seconds: float,
+    max_attempts: int,
+) -> None:
+    """Schedule a retry with jittered exponential backoff, or give up."""
+    if not ids:
+        return
+
+    delay = (
+        backoff_seconds * func.power(2, OutboxEvents.attempts) * (0.5 + func.random())
+    )
+    db.execute(
+        update(OutboxEvents)
+        .where(OutboxEvents.id.in_(ids))
+        .values(
+            attempts=OutboxEvents.attempts + 1,
+            last_error=error[:1000],
+            next_attempt_at=func.now() + func.make_interval(0, 0, 0, 0, 0, 0, delay),
+            failed_at=case(
+                (OutboxEvents.attempts + 1 >= max_attempts, func.now()), else_=None
+            ),
+        ),
+        execution_options={"synchronize_session": False},
+    )
+    db.commit()
@@ -0,0 +1,45 @@
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from uuid import UUID
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+NOTIFY_SINK = os.getenv("NOTIFY_SINK", "stdout")
+
+
+class DigestSink(ABC):
+    """Where offline digests end up (push gateway, email, ...)."""
+
+    @abstractmethod
+    async def deliver(self, recipient_id: UUID, digest: dict): ...
+
+
+class StdoutSink(DigestSink):
+    async def deliver(self, recipient_id: UUID, digest: dict):
+        print(f"📬 Digest for {recipient_id}: {json.dumps(digest)}")
+
+
+class FileSink(DigestSink):
+    """Appends one JSON line per digest; handy for tests."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _append(self, line: str):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    async def deliver(self, recipient_id: UUID, digest: dict):
+        await asyncio.to_thread(self._append, json.dumps(digest))
+
+
+def get_sink(spec: str = NOTIFY_SINK) -> DigestSink:
+    if spec.startswith("file:"):
+        return FileSink(spec.removeprefix("file:"))
+    if spec == "stdout":
+        return StdoutSink()
+    raise RuntimeError(f"Unknown NOTIFY_SINK: {spec}")
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Iterable
+from uuid import UUID
+
+from dotenv import load_dotenv
+
+from src.database.dbcore import SessionLocal
+from src.notifications.service import (
+    insert_outbox_events,
+    claim_due_events,
+    mark_delivered,
+    mark_failed,
+)
+from src.notifications.sinks import DigestSink, get_sink
+
+load_dotenv()
+
+NOTIFY_FLUSH_MS = int(os.getenv("NOTIFY_FLUSH_MS", "1000"))
+NOTIFY_DIGEST_INTERVAL_SECONDS = float(
+    os.getenv("NOTIFY_DIGEST_INTERVAL_SECONDS", "60")
+)
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "500"))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5"))
+NOTIFY_BACKOFF_SECONDS = float(os.getenv("NOTIFY_BACKOFF_SECONDS", "30"))
+# (recipient, chat) entries held in memory between flushes or while the
+# outbox is unreachable; the oldest go first
+NOTIFY_MAX_PENDING = int(os.getenv("NOTIFY_MAX_PENDING", "50000"))
+
+
+def _run_db(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+class OfflineDeliveryWorker:
+    """Collects events for offline users and delivers them as digests.
+
+    enqueue() only touches memory, so the WebSocket send path does no I/O
+    for offline recipients. Events are coalesced per recipient, type and
+    chat: the entry keeps the latest payload and a count, so a busy group
+    costs one outbox row per offline member per flush rather than one per
+    message. The background loop writes the entries to the outbox table in
+    one insert per flush, and every digest interval claims due events,
+    groups them per recipient and hands one digest per user to the sink.
+    Failed deliveries are retried with exponential backoff. At most
+    max_pending entries wait in memory; past that the oldest are dropped
+    and counted, so an outbox outage cannot exhaust memory.
+    """
+
+    def __init__(
+        self,
+        sink: DigestSink | None = None,
+        flush_ms: int = NOTIFY_FLUSH_MS,
+        digest_interval: float = NOTIFY_DIGEST_INTERVAL_SECONDS,
+        batch_size: int = NOTIFY_BATCH_SIZE,
+        max_attempts: int = NOTIFY_MAX_ATTEMPTS,
+        backoff_seconds: float = NOTIFY_BACKOFF_SECONDS,
+        max_pending: int = NOTIFY_MAX_PENDING,
+    ):
+        self.sink = sink or get_sink()
+        self.flush_interval = flush_ms / 1000
+        self.digest_interval = digest_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_pending = max_pending
+        # (recipient_id, event_type, chat_id) -> [count, latest payload]
+        self._pending: dict[tuple[UUID, str, str | None], list] = {}
+        self._dropped = 0
+        self._last_dispatch = time.monotonic()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.persist()
+
+    def enqueue(self, recipient_id: UUID, event_type: str, payload: dict):
+        self.enqueue_many((recipient_id,), event_type, payload)
+
+    def enqueue_many(
+        self, recipient_ids: Iterable[UUID], event_type: str, payload: dict
+    ):
+        chat_id = payload.get("chat_id")
+        pending = self._pending
+        for recipient_id in recipient_ids:
+            key = (recipient_id, event_type, chat_id)
+            queued = pending.get(key)
+            if queued is not None:
+                queued[0] += 1
+                queued[1] = payload
+                continue
+            if len(pending) >= self.max_pending:
+                self._dropped += pending.pop(next(iter(pending)))[0]
+            pending[key] = [1, payload]
+
+    async def persist(self):
+        if self._dropped:
+            logging.warning(
+                f"Offline queue full, dropped {self._dropped} oldest event(s)"
+            )
+            self._dropped = 0
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        rows = [
+            (recipient_id, event_type, {**payload, "count": count})
+            for (recipient_id, event_type, _), (count, payload) in pending.items()
+        ]
+        try:
+            await asyncio.to_thread(_run_db, insert_outbox_events, rows)
+        except Exception as e:
+            # merge what arrived meanwhile; newer entries win if it does not fit
+            for key, (count, payload) in self._pending.items():
+                queued = pending.get(key)
+                if queued is None:
+                    pending[key] = [count, payload]
+                else:
+                    queued[0] += count
+                    queued[1] = payload
+            while len(pending) > self.max_pending:
+                self._dropped += pending.pop(next(iter(pending)))[0]
+            self._pending = pending
+            logging.error(f"Outbox write failed, will retry: {e}")
+
+    async def dispatch(self):
+        while True:
+            events = await asyncio.to_thread(
+                _run_db,
+                claim_due_events,
+                self.batch_size,
+                self.backoff_seconds * 10,
+            )
+            if not events:
+                return
+
+            by_recipient = defaultdict(list)
+            for event in events:
+                by_recipient[event.recipient_id].append(event)
+
+            delivered = []
+            for recipient_id, recipient_events in by_recipient.items():
+                ids = [event.id for event in recipient_events]
+                try:
+                    await self.sink.deliver(
+                        recipient_id, self._digest(recipient_id, recipient_events)
+                    )
+                    delivered.extend(ids)
+                except Exception as e:
+                    logging.warning(f"Digest delivery to {recipient_id} failed: {e}")
+                    await asyncio.to_thread(
+                        _run_db,
+                        mark_failed,
+                        ids,
+                        str(e),
+                        self.backoff_seconds,
+                        self.max_attempts,
+                    )
+
+            await asyncio.to_thread(_run_db, mark_delivered, delivered)
+
+            if len(events) < self.batch_size:
+                return
+
+    @staticmethod
+    def _digest(recipient_id: UUID, events: list) -> dict:
+        # a row stands for `count` coalesced events; older rows have none
+        per_chat = defaultdict(int)
+        total = 0
+        for event in events:
+            count = event.payload.get("count", 1)
+            total += count
+            chat_id = event.payload.get("chat_id")
+            if chat_id:
+                per_chat[chat_id] += count
+
+        return {
+            "recipient_id": str(recipient_id),
+            "count": total,
+            "chats": per_chat,
+            "events": [{"type": event.event_type, **event.payload} for event in events],
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.persist()
+                if time.monotonic() - self._last_dispatch >= self.digest_interval:
+                    self._last_dispatch = time.monotonic()
+                    await self.dispatch()
+            except Exception as e:
+                logging.error(f"Offline delivery tick failed: {e}")
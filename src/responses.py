@@ -0,0 +1,13 @@
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by pydantic-core instead of json.dumps.
+
+    Handles pydantic models, UUIDs and datetimes natively, so response
+    bodies never go through jsonable_encoder.
+    """
+
+    def render(self, content) -> bytes:
+        return to_json(content)
@@ -0,0 +1,43 @@
+import gc
+import tracemalloc
+import uuid
+
+from src.chats.registry import ConnectionRegistry
+
+
+class FakeWebSocket:
+    __slots__ = ()
+
+
+def measure(connections: int, sockets_per_user: int = 1) -> float:
+    users = [uuid.uuid4() for _ in range(connections // sockets_per_user)]
+    sockets = [FakeWebSocket() for _ in range(connections)]
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    registry = ConnectionRegistry()
+    for i, ws in enumerate(sockets):
+        # rebuild the UUID like the endpoint does for every connect
+        registry.add(uuid.UUID(int=users[i // sockets_per_user].int), ws)
+
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    assert len(registry) == connections
+    return (after - before) / connections
+
+
+def main():
+    for connections in (10_000, 100_000):
+        for sockets_per_user in (1, 2):
+            per_conn = measure(connections, sockets_per_user)
+            print(
+                f"{connections:>7} connections, {sockets_per_user} socket(s)/user: "
+                f"{per_conn:.0f} bytes/connection"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Measure group chat fan-out latency through ConnectionManager.
+
+    python -m src.scripts.bench_group_fanout --messages 200 --online 0.5
+
+For each group size one chat is indexed in memory, a share of its members
+is connected with fake sockets, and every message goes through
+ConnectionManager.publish_message, the WebSocket send path after the
+insert: broadcast plus digest queueing for offline members. All messages
+fall in one outbox flush, so "outbox rows" is what that flush would
+write. Latency is
+measured from the start of a send until each socket has the frame;
+"last" is the time until the final recipient has it and "send" the time
+until publish_message returns. No database is touched.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timezone
+
+from src.chats.websocket import ConnectionManager
+
+
+class FakeWebSocket:
+    __slots__ = ("received_at",)
+
+    def __init__(self):
+        self.received_at = 0.0
+
+    async def send_text(self, text: str):
+        self.received_at = time.perf_counter()
+
+
+def percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def measure(members: int, online: float, messages: int, batching: bool):
+    manager = ConnectionManager()
+    chat_id = uuid.uuid4()
+    member_ids = [uuid.uuid4() for _ in range(members)]
+    manager.track_chat(chat_id, member_ids)
+
+    sockets = []
+    for member_id in random.sample(member_ids, max(1, int(members * online))):
+        ws = FakeWebSocket()
+        manager.active_connections.add(member_id, ws, batching)
+        sockets.append(ws)
+
+    per_recipient, last, send = [], [], []
+    for i in range(messages):
+        started = time.perf_counter()
+        await manager.publish_message(
+            member_ids[0],
+            chat_id,
+            uuid.uuid4(),
+            f"message {i}",
+            None,
+            datetime.now(timezone.utc),
+        )
+        send.append((time.perf_counter() - started) * 1000)
+        if batching:
+            await manager._flush_task
+        latencies = [(ws.received_at - started) * 1000 for ws in sockets]
+        per_recipient.extend(latencies)
+        last.append(max(latencies))
+
+    return {
+        "online": len(sockets),
+        "outbox_rows": len(manager.offline_delivery._pending),
+        "send_p50": statistics.median(send),
+        "p50": statistics.median(per_recipient),
+        "p99": percentile(per_recipient, 0.99),
+        "last_p50": statistics.median(last),
+        "last_p99": percentile(last, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark group fan-out")
+    parser.add_argument("--sizes", default="10,1000,10000")
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument(
+        "--online", type=float, default=1.0, help="share of members connected"
+    )
+    parser.add_argument(
+        "--batch", action="store_true", help="clients negotiated features=batch"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    for size in (int(size) for size in args.sizes.split(",")):
+        result = asyncio.run(measure(size, args.online, args.messages, args.batch))
+        print(
+            f"{size:>6} members ({result['online']} online): "
+            f"send p50 {result['send_p50']:.3f} ms, "
+            f"{result['outbox_rows']} outbox rows for {args.messages} messages, "
+            f"per recipient p50 {result['p50']:.3f} ms p99 {result['p99']:.3f} ms, "
+            f"last recipient p50 {result['last_p50']:.3f} ms "
+            f"p99 {result['last_p99']:.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
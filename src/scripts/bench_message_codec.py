@@ -0,0 +1,149 @@
+"""Storage saved vs CPU spent by the message body codec.
+
+    python -m src.scripts.bench_message_codec --repeat 50
+
+Runs encode_text/decode_text over a few body shapes (short chat lines,
+pasted logs, code, incompressible noise) and reports the per-message
+encode/decode cost and the stored size with and without the codec.
+
+Postgres already compresses large text values itself (TOAST, pglz, from
+about 2 KB), and the codec's base64 wrapper adds a third, so the byte
+length of the strings says little. Both versions of every body are
+written to a temp table and measured with pg_column_size, which is what
+a row actually takes; "saved" compares those two. The transaction is
+rolled back. --no-db skips this and only prints string lengths.
+"""
+
+import argparse
+import base64
+import os
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from src.database.codecs import decode_text, encode_text
+from src.database.dbcore import engine
+
+
+def chat_line(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 25)))
+
+
+def log_block(rng, lines=400):
+    return "\n".join(
+        f"2025-10-{rng.randint(1, 28):02d}T12:{rng.randint(0, 59):02d}:00Z "
+        f"{rng.choice(['INFO', 'WARN', 'ERROR'])} worker-{rng.randint(1, 8)} "
+        f"request_id={rng.getrandbits(64):016x} {chat_line(rng)}"
+        for _ in range(lines)
+    )
+
+
+def code_block(rng, functions=60):
+    return "\n\n".join(
+        f"def handler_{i}(request):\n"
+        f"    value = request.get('{rng.choice(WORDS)}')\n"
+        f"    if value is None:\n"
+        f"        raise ValueError('missing {rng.choice(WORDS)}')\n"
+        f"    return process(value, retries={rng.randint(1, 5)})"
+        for i in range(functions)
+    )
+
+
+def noise(rng, size=20_000):
+    return base64.b64encode(rng.randbytes(size)).decode()
+
+
+WORDS = "the a deploy failed retry user chat message ok thanks see log error".split()
+
+SHAPES = {
+    "chat line": chat_line,
+    "log paste": log_block,
+    "code paste": code_block,
+    "random b64": noise,
+}
+
+
+def pg_sizes(conn, bodies: list[str], encoded: list[str]) -> tuple[int, int]:
+    """Total pg_column_size of the bodies stored as they are and encoded."""
+    conn.execute(text("DELETE FROM codec_bench"))
+    conn.execute(
+        text("INSERT INTO codec_bench (encoded, body) VALUES (:encoded, :body)"),
+        [{"encoded": False, "body": body} for body in bodies]
+        + [{"encoded": True, "body": value} for value in encoded],
+    )
+    rows = conn.execute(
+        text(
+            "SELECT encoded, sum(pg_column_size(body)) FROM codec_bench "
+            "GROUP BY encoded"
+        )
+    ).all()
+    sizes = dict(rows)
+    return sizes[False], sizes[True]
+
+
+def run(repeat: int, conn):
+    rng = random.Random(7)
+
+    header = f"{'shape':<12}{'raw KB':>9}{'codec KB':>10}"
+    if conn is not None:
+        header += f"{'pg raw KB':>11}{'pg codec KB':>13}{'saved':>8}"
+    print(header + f"{'enc us':>9}{'dec us':>9}")
+
+    for name, make in SHAPES.items():
+        bodies = [make(rng) for _ in range(repeat)]
+        raw = sum(len(body.encode()) for body in bodies)
+
+        enc_times, encoded = [], []
+        for body in bodies:
+            started = time.perf_counter()
+            encoded.append(encode_text(body))
+            enc_times.append(time.perf_counter() - started)
+
+        dec_times = []
+        for value in encoded:
+            started = time.perf_counter()
+            decode_text(value)
+            dec_times.append(time.perf_counter() - started)
+
+        stored = sum(len(value.encode()) for value in encoded)
+        line = f"{name:<12}{raw / repeat / 1024:>9.1f}{stored / repeat / 1024:>10.1f}"
+        if conn is not None:
+            pg_raw, pg_codec = pg_sizes(conn, bodies, encoded)
+            line += (
+                f"{pg_raw / repeat / 1024:>11.1f}{pg_codec / repeat / 1024:>13.1f}"
+                f"{1 - pg_codec / pg_raw:>8.0%}"
+            )
+        print(
+            line + f"{statistics.median(enc_times) * 1e6:>9.0f}"
+            f"{statistics.median(dec_times) * 1e6:>9.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the message codec")
+    parser.add_argument(
+        "--repeat", type=int, default=int(os.getenv("BENCH_REPEAT", "50"))
+    )
+    parser.add_argument(
+        "--no-db", action="store_true", help="skip the pg_column_size comparison"
+    )
+    args = parser.parse_args()
+
+    if args.no_db:
+        run(args.repeat, None)
+        return
+
+    with engine.connect() as conn:
+        # default storage (EXTENDED), so Postgres compresses as it would
+        # for messages.content
+        conn.execute(text("CREATE TEMP TABLE codec_bench (encoded boolean, body text)"))
+        try:
+            run(args.repeat, conn)
+        finally:
+            conn.rollback()
+
+
+if __name__ == "__main__":
+    main()
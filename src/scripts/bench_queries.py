@@ -0,0 +1,208 @@
+"""Time the chat and user service functions against the current database.
+
+    python -m src.scripts.bench_queries --save-baseline bench_baseline.json
+    python -m src.scripts.bench_queries --baseline bench_baseline.json
+
+Run src.scripts.generate_dataset first. Everything runs inside one outer
+transaction that is rolled back at the end; service commits become
+savepoints, so create_chat and delete_message_by_id leave no trace.
+Each SELECT issued by a function is re-run once under
+EXPLAIN (ANALYZE, BUFFERS) and the plan is written to --plans.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from src.database.dbcore import engine
+from src.chats.service import (
+    get_all_user_chat,
+    get_all_messages_for_chat,
+    create_chat,
+    delete_message_by_id,
+)
+from src.users.service import get_all_users_from_db
+
+
+def pick_fixtures(db: Session, iterations: int) -> dict:
+    heavy_user = db.execute(
+        text(
+            "SELECT user_id FROM chat_members "
+            "GROUP BY user_id ORDER BY count(*) DESC LIMIT 1"
+        )
+    ).scalar()
+    heavy_chat = db.execute(
+        text(
+            "SELECT chat_id, min(sender_id::text)::uuid AS member_id FROM messages "
+            "GROUP BY chat_id ORDER BY count(*) DESC LIMIT 1"
+        )
+    ).first()
+    if heavy_user is None or heavy_chat is None:
+        raise SystemExit("No data: run src.scripts.generate_dataset first")
+
+    # fresh user pairs with no chat between them, one per iteration
+    pairs = db.execute(
+        text(
+            "SELECT a.id, b.id FROM "
+            " (SELECT id, row_number() OVER () AS n FROM users LIMIT :n) a "
+            " JOIN (SELECT id, row_number() OVER () AS n FROM users"
+            "       OFFSET :n LIMIT :n) b USING (n) "
+            "WHERE NOT EXISTS (SELECT 1 FROM chats c WHERE "
+            " c.user1_id = least(a.id, b.id) AND c.user2_id = greatest(a.id, b.id))"
+        ),
+        {"n": iterations},
+    ).all()
+    # delete_message_by_id only lets the sender delete
+    messages = db.execute(
+        text("SELECT id, sender_id FROM messages WHERE chat_id = :chat_id LIMIT :n"),
+        {"chat_id": heavy_chat.chat_id, "n": iterations},
+    ).all()
+
+    return {
+        "user_id": heavy_user,
+        "chat_id": heavy_chat.chat_id,
+        "member_id": heavy_chat.member_id,
+        "pairs": pairs,
+        "messages": messages,
+    }
+
+
+def cases(fixtures: dict) -> dict:
+    user_id = fixtures["user_id"]
+    chat_id = fixtures["chat_id"]
+    pairs = iter(fixtures["pairs"])
+    member_id = fixtures["member_id"]
+    messages = iter(fixtures["messages"])
+
+    return {
+        "get_all_user_chat": lambda db: get_all_user_chat(db, user_id),
+        "get_all_messages_for_chat": lambda db: get_all_messages_for_chat(
+            db, chat_id=chat_id, current_user_id=member_id
+        ),
+        "create_chat": lambda db: create_chat(db, *next(pairs)),
+        "get_all_users_from_db": lambda db: get_all_users_from_db(db, user_id),
+        "delete_message_by_id": lambda db: delete_message_by_id(db, *next(messages)),
+    }
+
+
+def explain(connection, statements: list) -> list:
+    plans = []
+    for statement, parameters in statements:
+        if not statement.lstrip().upper().startswith("SELECT"):
+            continue
+        with connection.begin_nested():
+            plan = connection.exec_driver_sql(
+                "EXPLAIN (ANALYZE, BUFFERS, FORMAT TEXT) " + statement, parameters
+            ).all()
+        plans.append(
+            {"statement": statement, "plan": "\n".join(row[0] for row in plan)}
+        )
+    return plans
+
+
+def run(iterations: int, warmup: int) -> tuple[dict, dict]:
+    results, plans = {}, {}
+
+    with engine.connect() as connection:
+        outer = connection.begin()
+        db = Session(bind=connection, join_transaction_mode="create_savepoint")
+        try:
+            fixtures = pick_fixtures(db, iterations + warmup + 1)
+            for name, fn in cases(fixtures).items():
+                captured = []
+
+                def capture(conn, cursor, statement, parameters, context, many):
+                    captured.append((statement, parameters))
+
+                timings = []
+                for i in range(warmup + iterations):
+                    captured.clear()
+                    event.listen(connection, "before_cursor_execute", capture)
+                    started = time.perf_counter()
+                    try:
+                        fn(db)
+                    except (HTTPException, StopIteration):
+                        pass
+                    finally:
+                        elapsed = time.perf_counter() - started
+                        event.remove(connection, "before_cursor_execute", capture)
+                    db.expunge_all()
+                    if i >= warmup:
+                        timings.append(elapsed * 1000)
+
+                timings.sort()
+                results[name] = {
+                    "mean_ms": statistics.fmean(timings),
+                    "p50_ms": timings[len(timings) // 2],
+                    "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+                    "queries": len(captured),
+                }
+                plans[name] = explain(connection, captured)
+        finally:
+            db.close()
+            outer.rollback()
+
+    return results, plans
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> bool:
+    regressed = False
+    print(f"{'function':<28}{'p50 ms':>10}{'base':>10}{'delta':>9}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<28}{result['p50_ms']:>10.2f}{'-':>10}{'new':>9}")
+            continue
+        delta = (result["p50_ms"] - base["p50_ms"]) / base["p50_ms"] * 100
+        flag = ""
+        if delta > threshold:
+            regressed = True
+            flag = "  REGRESSION"
+        print(
+            f"{name:<28}{result['p50_ms']:>10.2f}{base['p50_ms']:>10.2f}"
+            f"{delta:>8.1f}%{flag}"
+        )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark service queries")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--plans", default="bench_plans.txt")
+    parser.add_argument("--baseline", help="compare against this JSON file")
+    parser.add_argument("--save-baseline", help="write results to this JSON file")
+    parser.add_argument(
+        "--threshold", type=float, default=20.0, help="p50 regression in percent"
+    )
+    args = parser.parse_args()
+
+    results, plans = run(args.iterations, args.warmup)
+
+    with open(args.plans, "w") as f:
+        for name, entries in plans.items():
+            for entry in entries:
+                f.write(f"== {name}\n{entry['statement']}\n{entry['plan']}\n\n")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressed = compare(results, baseline, args.threshold)
+    print(f"Plans written to {args.plans}")
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
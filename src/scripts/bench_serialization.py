@@ -0,0 +1,73 @@
+"""Compare response serialization cost for a large /chats/all-messages body.
+
+    python -m src.scripts.bench_serialization --messages 10000
+
+"legacy" is what a route without response_model did: hydrated ORM objects
+through jsonable_encoder and json.dumps. "typed" is the current path: row
+tuples validated into MessageResponse in one call, the response_model
+round-trip FastAPI performs, and FastJSONResponse rendering.
+"""
+
+import argparse
+import statistics
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.chats.service import message_list_adapter
+from src.entities.messages import Messages
+from src.responses import FastJSONResponse
+
+Row = namedtuple("Row", "id chat_id sender_id content created_at")
+
+
+def legacy(objects):
+    return JSONResponse(jsonable_encoder(objects)).body
+
+
+def typed(rows):
+    messages = message_list_adapter.validate_python(rows, from_attributes=True)
+    # what FastAPI does with the return value when response_model is set
+    validated = message_list_adapter.validate_python(messages)
+    content = message_list_adapter.dump_python(validated, mode="json")
+    return FastJSONResponse(content).body
+
+
+def timeit(fn, arg, repeat: int) -> tuple[float, int]:
+    timings, size = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(fn(arg))
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response serialization")
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--content-length", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    chat_id, now = uuid.uuid4(), datetime.now(timezone.utc)
+    rows = [
+        Row(uuid.uuid4(), chat_id, uuid.uuid4(), "x" * args.content_length, now)
+        for _ in range(args.messages)
+    ]
+    objects = [Messages(**row._asdict()) for row in rows]
+
+    legacy_ms, legacy_size = timeit(legacy, objects, args.repeat)
+    typed_ms, typed_size = timeit(typed, rows, args.repeat)
+
+    print(f"{args.messages} messages")
+    print(f"  legacy: {legacy_ms:8.1f} ms  {legacy_size} bytes")
+    print(f"  typed:  {typed_ms:8.1f} ms  {typed_size} bytes")
+    print(f"  speedup: {legacy_ms / typed_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
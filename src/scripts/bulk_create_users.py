@@ -0,0 +1,172 @@
+"""Bulk-import users from CSV or NDJSON.
+
+    python -m src.scripts.bulk_create_users users.csv --workers 8
+
+Each row needs email, username and password. Rows are validated with the
+same rules as /auth/create, passwords are hashed across a process pool and
+every batch is loaded with COPY into a temp table followed by a single
+INSERT ... ON CONFLICT DO NOTHING, so rows clashing on email or username
+(with the table or within the file) are skipped instead of failing.
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+
+from pydantic import ValidationError
+
+from src.auth.schemas import RegisterUserRequest
+from src.auth.service import get_password_hash
+from src.database.dbcore import engine
+
+COLUMNS = ("id", "email", "username", "password")
+
+
+def read_rows(path: str, fmt: str) -> Iterator[tuple[int, dict | str]]:
+    """CSV rows as dicts; NDJSON lines as text, parsed in validated()."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                yield line_no, row
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_no, line
+
+
+def validated(rows, stats: dict) -> Iterator[RegisterUserRequest]:
+    for line_no, row in rows:
+        try:
+            if isinstance(row, str):
+                row = json.loads(row)
+            if not isinstance(row, dict):
+                raise ValueError("not a JSON object")
+            user = RegisterUserRequest(
+                email=row.get("email"),
+                username=row.get("username"),
+                password=row.get("password"),
+            )
+        except ValidationError as e:
+            stats["invalid"] += 1
+            logging.warning(f"Line {line_no} skipped: {e.errors()[0]['msg']}")
+            continue
+        except ValueError as e:
+            # malformed NDJSON; caught after ValidationError, which subclasses it
+            stats["invalid"] += 1
+            logging.warning(f"Line {line_no} skipped: {e}")
+            continue
+        yield user
+
+
+def batched(items, size: int):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def copy_batch(cursor, users: list[RegisterUserRequest], hashes: list[str]) -> int:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for user, hashed in zip(users, hashes):
+        writer.writerow((uuid.uuid4(), user.email, user.username, hashed))
+    buffer.seek(0)
+
+    cursor.copy_expert(
+        f"COPY users_import ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer,
+    )
+    cursor.execute(
+        f"INSERT INTO users ({', '.join(COLUMNS)}) "
+        f"SELECT {', '.join(COLUMNS)} FROM users_import "
+        "ON CONFLICT DO NOTHING"
+    )
+    inserted = cursor.rowcount
+    cursor.execute("TRUNCATE users_import")
+    return inserted
+
+
+def run(path: str, fmt: str, workers: int | None, batch_size: int) -> dict:
+    workers = workers or os.cpu_count() or 1
+    stats = {"read": 0, "invalid": 0, "inserted": 0, "conflicts": 0}
+
+    def counted(rows):
+        for row in rows:
+            stats["read"] += 1
+            yield row
+
+    conn = engine.raw_connection()
+    started = time.perf_counter()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "CREATE TEMP TABLE users_import "
+            "(LIKE users INCLUDING DEFAULTS) ON COMMIT PRESERVE ROWS"
+        )
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = validated(counted(read_rows(path, fmt)), stats)
+            for batch in batched(rows, batch_size):
+                chunksize = max(1, len(batch) // (workers * 4))
+                hashes = list(
+                    pool.map(
+                        get_password_hash,
+                        [user.password for user in batch],
+                        chunksize=chunksize,
+                    )
+                )
+
+                inserted = copy_batch(cursor, batch, hashes)
+                conn.commit()
+
+                stats["inserted"] += inserted
+                stats["conflicts"] += len(batch) - inserted
+                elapsed = time.perf_counter() - started
+                print(
+                    f"read={stats['read']} inserted={stats['inserted']} "
+                    f"conflicts={stats['conflicts']} invalid={stats['invalid']} "
+                    f"({stats['inserted'] / elapsed:.1f} users/s)",
+                    flush=True,
+                )
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-create users")
+    parser.add_argument("path", help="CSV (with header) or NDJSON file")
+    parser.add_argument("--format", choices=("csv", "ndjson"), default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    stats = run(args.path, fmt, args.workers, args.batch_size)
+
+    rate = stats["inserted"] / stats["seconds"] if stats["seconds"] else 0
+    print(
+        f"Done in {stats['seconds']:.1f}s: {stats['inserted']} created, "
+        f"{stats['conflicts']} already existed, {stats['invalid']} invalid "
+        f"({rate:.1f} users/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
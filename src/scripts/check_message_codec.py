@@ -0,0 +1,60 @@
+"""Round-trip check for the message body codec.
+
+    python -m src.scripts.check_message_codec
+
+Covers new writes (short, long, ESC-prefixed) and values stored before
+the codec existed, which are read back as they are: plain text, pasted
+ANSI-coloured logs that start with ESC, and the same after the backfill
+in src.scripts.compress_messages has escaped them. Exits non-zero on
+the first mismatch.
+"""
+
+from src.database.codecs import PLAIN_V0, ZLIB_V1, decode_text, encode_text
+
+ANSI_LOG = "\x1b[31mERROR\x1b[0m worker-3 request failed\n" * 200
+
+NEW_VALUES = [
+    None,
+    "",
+    "hi",
+    "x" * 5000,
+    "\x1b",
+    "\x1bz1:not base64",
+    "\x1bp0:already tagged",
+    "\x1b[31mERROR\x1b[0m short",
+    ANSI_LOG,
+    "ünïcödé " * 500,
+]
+
+# (stored before the codec, what readers must get back)
+LEGACY_ROWS = [
+    ("plain old row", "plain old row"),
+    ("\x1b[31mERROR\x1b[0m disk full", "\x1b[31mERROR\x1b[0m disk full"),
+    ("\x1b", "\x1b"),
+    ("\x1bq9:unknown tag", "\x1bq9:unknown tag"),
+    (ANSI_LOG, ANSI_LOG),
+]
+
+
+def check(label: str, got, expected):
+    if got != expected:
+        raise SystemExit(f"FAIL {label}: {got!r:.40} != {expected!r:.40}")
+
+
+def main():
+    for value in NEW_VALUES:
+        stored = encode_text(value)
+        check(f"new {value!r:.30}", decode_text(stored), value)
+        if value is not None and value.startswith("\x1b"):
+            check(f"tagged {value!r:.30}", stored[:4] in (ZLIB_V1, PLAIN_V0), True)
+
+    for stored, expected in LEGACY_ROWS:
+        check(f"legacy {stored!r:.30}", decode_text(stored), expected)
+        # what compress_messages writes back must still decode the same
+        check(f"backfilled {stored!r:.30}", decode_text(encode_text(stored)), expected)
+
+    print(f"OK: {len(NEW_VALUES)} new and {len(LEGACY_ROWS)} legacy values")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Show which server each kind of session statement is routed to.
+
+Start two local Postgres instances (the replica may be a plain second
+server for this check), then:
+
+    POSTGRES_URL=postgresql://localhost:5432/chat \\
+    POSTGRES_REPLICA_URL=postgresql://localhost:5433/chat \\
+    python -m src.scripts.check_replica_routing
+"""
+
+from sqlalchemy import func, select
+
+from src.database.dbcore import SessionLocal, get_routing_metrics, replica_engine
+
+SERVER = select(func.inet_server_addr(), func.inet_server_port())
+
+
+def main():
+    if replica_engine is None:
+        raise SystemExit("POSTGRES_REPLICA_URL is not set")
+
+    db = SessionLocal()
+    db.info.update(read_only=True, client_key="check")
+    print("GET read:            ", db.execute(SERVER).one())
+    db.close()
+
+    db = SessionLocal()
+    db.info.update(read_only=False, client_key="check")
+    print("POST read:           ", db.execute(SERVER).one())
+    db.commit()
+    db.close()
+
+    db = SessionLocal()
+    db.info.update(read_only=True, client_key="check")
+    print("GET right after POST:", db.execute(SERVER).one())
+    db.close()
+
+    print(get_routing_metrics())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Compress existing message bodies that are over the threshold.
+
+    python -m src.scripts.compress_messages --batch-size 1000 [--dry-run]
+
+New messages are compressed on write by CompressedText; this only
+rewrites older rows. Legacy rows that start with the codec marker (ESC,
+e.g. pasted ANSI colour codes) are rewritten with the plain-text tag so
+they can never be mistaken for an encoded value. Rows are walked in primary-key order in batches,
+each batch in its own transaction, so the script can be stopped and
+re-run at any time.
+"""
+
+import argparse
+import time
+import uuid
+
+from sqlalchemy import Text, and_, bindparam, func, or_, select, type_coerce
+
+from src.database.codecs import (
+    MARKER,
+    MESSAGE_COMPRESS_MIN_BYTES,
+    PLAIN_V0,
+    ZLIB_V1,
+    encode_text,
+)
+from src.database.dbcore import engine
+from src.entities.messages import Messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill message compression")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--min-bytes", type=int, default=MESSAGE_COMPRESS_MIN_BYTES)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    # type_coerce to Text bypasses CompressedText, so we see what is stored
+    raw_content = type_coerce(Messages.__table__.c.content, Text)
+    candidates = (
+        select(Messages.id, raw_content.label("stored"))
+        .where(
+            Messages.id > bindparam("after"),
+            or_(
+                and_(
+                    func.octet_length(raw_content) >= args.min_bytes,
+                    func.left(raw_content, 1) != MARKER,
+                ),
+                # legacy ESC-prefixed rows, whatever their size
+                and_(
+                    func.left(raw_content, 1) == MARKER,
+                    func.left(raw_content, len(ZLIB_V1)).not_in([ZLIB_V1, PLAIN_V0]),
+                ),
+            ),
+        )
+        .order_by(Messages.id)
+        .limit(args.batch_size)
+    )
+    rewrite = (
+        Messages.__table__.update()
+        .where(Messages.__table__.c.id == bindparam("row_id"))
+        .values(content=bindparam("stored_content", type_=Text))
+    )
+
+    after = uuid.UUID(int=0)
+    rows_seen = rows_compressed = rows_escaped = bytes_before = bytes_after = 0
+    started = time.perf_counter()
+
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(candidates, {"after": after}).all()
+            if not rows:
+                break
+
+            updates = []
+            for row in rows:
+                encoded = encode_text(row.stored, args.min_bytes)
+                rows_seen += 1
+                bytes_before += len(row.stored.encode("utf-8"))
+                bytes_after += len(encoded.encode("utf-8"))
+                if encoded != row.stored:
+                    if encoded.startswith(PLAIN_V0):
+                        rows_escaped += 1
+                    else:
+                        rows_compressed += 1
+                    updates.append({"row_id": row.id, "stored_content": encoded})
+
+            if updates and not args.dry_run:
+                conn.execute(rewrite, updates)
+            after = rows[-1].id
+
+        print(
+            f"scanned={rows_seen} compressed={rows_compressed} "
+            f"escaped={rows_escaped} "
+            f"{bytes_before / 1e6:.1f} MB -> {bytes_after / 1e6:.1f} MB",
+            flush=True,
+        )
+
+    saved = bytes_before - bytes_after
+    print(
+        f"Done in {time.perf_counter() - started:.1f}s: {rows_compressed} rows "
+        f"compressed, {rows_escaped} legacy rows escaped, "
+        f"{saved / 1e6:.1f} MB saved" + (" (dry run)" if args.dry_run else "")
+    )
+
+
+if __name__ == "__main__":
+    main()
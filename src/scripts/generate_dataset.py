@@ -0,0 +1,153 @@
+"""Load a synthetic dataset for query benchmarking.
+
+    python -m src.scripts.generate_dataset --users 10000 --chats 50000 \\
+        --messages 2000000 --alpha 1.2
+
+Users get a shared pre-computed password hash ("Passw0rd!"). Messages are
+spread over chats with a power-law (Zipf) distribution, so a few chats are
+very large and most are small, like real traffic. Everything goes in with
+COPY in chunks, so memory stays flat regardless of volume.
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from src.auth.service import get_password_hash
+from src.database.dbcore import engine
+
+CHUNK_ROWS = 50_000
+
+
+def copy_rows(cursor, table: str, columns: tuple, rows) -> int:
+    total = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, CHUNK_ROWS))
+        if not chunk:
+            return total
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(chunk)
+        buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+        total += len(chunk)
+
+
+def generate_users(count: int, password_hash: str, run_id: str):
+    for i in range(count):
+        username = f"u{run_id}_{i}"
+        yield (uuid.uuid4(), f"{username}@example.com", username, password_hash)
+
+
+def generate_chats(user_ids: list, count: int, rng: random.Random):
+    max_pairs = len(user_ids) * (len(user_ids) - 1) // 2
+    if count > max_pairs:
+        raise SystemExit(
+            f"At most {max_pairs} chats possible for {len(user_ids)} users"
+        )
+
+    seen = set()
+    while len(seen) < count:
+        # stored ordered, like create_chat does
+        user1_id, user2_id = sorted(rng.sample(user_ids, 2))
+        pair = (user1_id, user2_id)
+        if pair in seen:
+            continue
+        seen.add(pair)
+        yield (uuid.uuid4(), user1_id, user2_id)
+
+
+def generate_messages(chats: list, count: int, alpha: float, days: int, rng):
+    # rank 1 is the busiest chat; weight ~ 1 / rank^alpha
+    cum_weights = list(
+        itertools.accumulate(1 / (rank**alpha) for rank in range(1, len(chats) + 1))
+    )
+    start = datetime.now(timezone.utc) - timedelta(days=days)
+    step = timedelta(days=days) / max(count, 1)
+
+    for i in range(count):
+        chat_id, user1_id, user2_id = rng.choices(chats, cum_weights=cum_weights)[0]
+        sender_id = user1_id if rng.random() < 0.5 else user2_id
+        length = min(int(rng.paretovariate(1.5) * 20), 4000)
+        content = "x" * length
+        yield (
+            uuid.uuid4(),
+            chat_id,
+            sender_id,
+            content,
+            (start + step * i).isoformat(),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--chats", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument(
+        "--alpha", type=float, default=1.1, help="Zipf skew of messages per chat"
+    )
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    run_id = uuid.uuid4().hex[:6]
+    password_hash = get_password_hash("Passw0rd!")
+
+    conn = engine.raw_connection()
+    started = time.perf_counter()
+    try:
+        cursor = conn.cursor()
+
+        users = list(generate_users(args.users, password_hash, run_id))
+        copy_rows(cursor, "users", ("id", "email", "username", "password"), users)
+        print(f"users:    {len(users)} ({time.perf_counter() - started:.1f}s)")
+
+        user_ids = [user[0] for user in users]
+        chats = list(generate_chats(user_ids, args.chats, rng))
+        copy_rows(cursor, "chats", ("id", "user1_id", "user2_id"), chats)
+        copy_rows(
+            cursor,
+            "chat_members",
+            ("chat_id", "user_id"),
+            (
+                (chat_id, user_id)
+                for chat_id, user1_id, user2_id in chats
+                for user_id in (user1_id, user2_id)
+            ),
+        )
+        print(f"chats:    {len(chats)} ({time.perf_counter() - started:.1f}s)")
+
+        total = copy_rows(
+            cursor,
+            "messages",
+            ("id", "chat_id", "sender_id", "content", "created_at"),
+            generate_messages(chats, args.messages, args.alpha, args.days, rng),
+        )
+        print(f"messages: {total} ({time.perf_counter() - started:.1f}s)")
+
+        conn.commit()
+        cursor.execute(
+            "ANALYZE users; ANALYZE chats; ANALYZE chat_members; ANALYZE messages"
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    print(f"Done in {time.perf_counter() - started:.1f}s (usernames u{run_id}_*)")
+
+
+if __name__ == "__main__":
+    main()
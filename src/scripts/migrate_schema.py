@@ -0,0 +1,65 @@
+"""Bring an existing database up to the current entities.
+
+    python -m src.scripts.migrate_schema
+
+Base.metadata.create_all only creates missing tables, so columns and
+indexes added to existing tables are applied here. Every statement is
+idempotent and safe to re-run.
+"""
+
+from sqlalchemy import text
+
+from src.database.dbcore import Base, engine
+
+STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS ix_messages_chat_id_created_at "
+    "ON messages (chat_id, created_at)",
+    "ALTER TABLE messages ADD COLUMN IF NOT EXISTS attachment_id UUID "
+    "REFERENCES attachments (id)",
+    # chats: fold B-A duplicates into their A-B twin, then store pairs ordered
+    "UPDATE messages m SET chat_id = keep.id FROM chats dup "
+    "JOIN chats keep ON keep.user1_id = dup.user2_id AND keep.user2_id = dup.user1_id "
+    "WHERE m.chat_id = dup.id AND dup.user1_id > dup.user2_id",
+    "UPDATE attachments a SET chat_id = keep.id FROM chats dup "
+    "JOIN chats keep ON keep.user1_id = dup.user2_id AND keep.user2_id = dup.user1_id "
+    "WHERE a.chat_id = dup.id AND dup.user1_id > dup.user2_id",
+    "DELETE FROM read_receipts r USING chats dup "
+    "JOIN chats keep ON keep.user1_id = dup.user2_id AND keep.user2_id = dup.user1_id "
+    "WHERE r.chat_id = dup.id AND dup.user1_id > dup.user2_id",
+    "DELETE FROM chats dup USING chats keep "
+    "WHERE keep.user1_id = dup.user2_id AND keep.user2_id = dup.user1_id "
+    "AND dup.user1_id > dup.user2_id",
+    "UPDATE chats SET user1_id = user2_id, user2_id = user1_id "
+    "WHERE user1_id > user2_id",
+    # NOT VALID: legacy self-chats (user1_id = user2_id) are kept as they are
+    "DO $$ BEGIN "
+    "IF NOT EXISTS (SELECT 1 FROM pg_constraint "
+    "WHERE conname = 'ck_chats_ordered_pair') THEN "
+    "ALTER TABLE chats ADD CONSTRAINT ck_chats_ordered_pair "
+    "CHECK (user1_id < user2_id) NOT VALID; "
+    "END IF; END $$",
+    "CREATE INDEX IF NOT EXISTS ix_chats_user2_id ON chats (user2_id, user1_id)",
+    # group chats: user1_id/user2_id only identify direct chats now, and
+    # chat_members (created by create_all above) holds every membership
+    "ALTER TABLE chats ADD COLUMN IF NOT EXISTS is_group BOOLEAN NOT NULL "
+    "DEFAULT false",
+    "ALTER TABLE chats ADD COLUMN IF NOT EXISTS title VARCHAR(100)",
+    "ALTER TABLE chats ALTER COLUMN user1_id DROP NOT NULL",
+    "ALTER TABLE chats ALTER COLUMN user2_id DROP NOT NULL",
+    "INSERT INTO chat_members (chat_id, user_id, joined_at) "
+    "SELECT id, user1_id, created_at FROM chats WHERE user1_id IS NOT NULL "
+    "UNION SELECT id, user2_id, created_at FROM chats WHERE user2_id IS NOT NULL "
+    "ON CONFLICT DO NOTHING",
+]
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for statement in STATEMENTS:
+            print(statement)
+            conn.execute(text(statement))
+
+
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,7 @@ async def get_current_user(current_user: CurrentUser, db: DbSession):
     return get_user_by_id(db, current_user.get_uuid())
 
 
-@router.get("/all")
+@router.get("/all", response_model=list[UserResponse])
 async def get_all_users(current_user: CurrentUser, db: DbSession):
     return get_all_users_from_db(db, current_user.user_id)
 
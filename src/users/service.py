@@ -82,18 +82,28 @@ def change_pass(db: Session, user_id: UUID, change_pass: PasswordChange) -> None
         )
 
 
-def get_all_users_from_db(db: Session, user_id: UUID) -> list[Users]:
+def get_all_users_from_db(db: Session, user_id: UUID) -> list[UserResponse]:
     try:
-        users = db.query(Users).filter(Users.id != user_id).all()
+        rows = (
+            db.query(Users.id, Users.email, Users.username)
+            .filter(Users.id != user_id)
+            .all()
+        )
 
-        if not users:
+        if not rows:
             logging.warning(f"No users found in the database.")
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found."
             )
 
-        logging.info(f"Successfully retrieved {len(users)} users.")
-        return users
+        logging.info(f"Successfully retrieved {len(rows)} users.")
+        # emails were validated on registration; skip EmailStr per row
+        return [
+            UserResponse.model_construct(
+                id=row.id, email=row.email, username=row.username
+            )
+            for row in rows
+        ]
 
     except Exception as e:
         logging.error(f"Error retrieving users : {e}")